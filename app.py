@@ -1,134 +1,654 @@
 import os
+import json
+import base64
+import logging
+import shutil
+import threading
+import time
 import uuid
+import tempfile
+import zipfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from collections import Counter
+from itertools import islice
 from io import BytesIO
-from datetime import datetime
+from datetime import date, datetime, timedelta
 
 from flask import (
     Flask, render_template, request, redirect,
-    send_file, flash
+    send_file, flash, jsonify, Response, g
 )
-from flask_sqlalchemy import SQLAlchemy
-from openpyxl import load_workbook
-from PIL import Image
+from sqlalchemy import and_, case, delete, or_, text, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from werkzeug.utils import secure_filename
+from reportlab import rl_config
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.utils import ImageReader
 
+import database
+import image_cache
+import metrics
+import migrations
+import pdf_cache
+import page_fragments
+import pdf_generator
+import pdf_stream
+import search_index
+import thumbnails
+from jobs import JobQueue, PeriodicTask
+from models import (
+    Company, ImageBlob, ImportJob, ImportRow, OrphanFile, Tile, db, parse_price,
+)
+import image_store
+from image_store import MAX_STORED_PX, save_normalised
+from template_assets import TemplateAsset
+from xlsx_images import XlsxImages
+
 # ------------------------------------------------
 # App + DB setup
 # ------------------------------------------------
-app = Flask(__name__, static_folder="static", static_url_path="/static")
-app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///database.db"
+log = logging.getLogger("app")
+
+# INSTANCE_PATH (absolute) moves the instance folder: default SQLite DB and
+# every cache below live there
+app = Flask(__name__, static_folder="static", static_url_path="/static",
+            instance_path=os.environ.get("INSTANCE_PATH") or None)
+# DATABASE_URL switches to PostgreSQL; see database.py for pool/WAL settings
+app.config["SQLALCHEMY_DATABASE_URI"] = database.database_url(app.instance_path)
+app.config["SQLALCHEMY_ENGINE_OPTIONS"] = database.engine_options(
+    app.config["SQLALCHEMY_DATABASE_URI"]
+)
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 app.secret_key = "dev_secret_for_flashes"
 
-db = SQLAlchemy(app)
+# Pre-scaled JPEGs of tile photos used on PDF pages (see image_cache.py)
+app.config["IMAGE_CACHE_DIR"] = os.path.join(app.instance_path, "image_cache")
+app.config["IMAGE_CACHE_MAX_BYTES"] = image_cache.DEFAULT_MAX_BYTES
+app.config["IMAGE_CACHE_DPI"] = image_cache.DEFAULT_DPI   # the "print" profile
+
+# Catalogue output profiles (?profile= on the PDF endpoints): resolution of
+# the tile photos and of the full-page backgrounds (None = embed the file as
+# it is), and the JPEG quality they are re-encoded at. "print" is the full
+# quality catalogue; "email" aims to stay under attachment limits.
+app.config["PDF_PROFILES"] = {
+    "screen": {"dpi": 96, "background_dpi": 72, "quality": 65},
+    "email": {"dpi": 130, "background_dpi": 96, "quality": 75},
+    "print": {"dpi": app.config["IMAGE_CACHE_DPI"], "background_dpi": None,
+              "quality": image_cache.DEFAULT_QUALITY},
+}
+DEFAULT_PDF_PROFILE = "print"
+
+# Streams go into the PDF as binary; reportlab's default ASCII85 wrapping
+# adds a quarter to every embedded photo. Page streams stay Flate compressed.
+rl_config.useA85 = 0
+
+# Grid thumbnails (see thumbnails.py); URLs carry the photo's content key,
+# so browsers may cache them for a year
+app.config["THUMBS_DIR"] = os.path.join(app.instance_path, "thumbs")
+app.config["THUMB_MAX_AGE"] = 365 * 24 * 3600
+
+# Processes used to pre-scale tile photos before drawing a catalogue
+# (0 or 1 = serial; unset = one per CPU core)
+app.config["PDF_RENDER_WORKERS"] = (
+    int(os.environ["PDF_RENDER_WORKERS"]) if os.environ.get("PDF_RENDER_WORKERS") else None
+)
+
+# Rendered PDFs are kept in memory up to this size, then spooled to an
+# anonymous temp file and streamed to the client in chunks
+app.config["PDF_SPOOL_MAX_BYTES"] = 16 * 1024 * 1024
+app.config["PDF_STREAM_CHUNK_BYTES"] = 64 * 1024
+
+# Streamed catalogues (stream=1 on /generate_pdf_multiple) are written page
+# by page as they are drawn; tiles are read and their photos pre-scaled this
+# many at a time
+app.config["PDF_STREAM_BATCH"] = 100
+
+# Excel import: tiles committed per batch; photos are in column G and are
+# normalised on a thread pool (PIL releases the GIL while decoding/encoding)
+app.config["EXCEL_IMPORT_BATCH_SIZE"] = 200
+app.config["EXCEL_IMPORT_IMAGE_WORKERS"] = min(4, os.cpu_count() or 1)
+app.config["STORED_IMAGE_MAX_PX"] = MAX_STORED_PX
+
+# Photo files released by delete_tiles are removed by a background sweeper;
+# stored photos whose last tile went are kept for a grace period in case a
+# concurrent upload/import is about to reuse them
+app.config["IMAGE_SWEEP_INTERVAL"] = 300
+app.config["IMAGE_SWEEP_GRACE_SECONDS"] = 120
+# how often tile photo files are re-checked (flags Tile.image_missing)
+app.config["IMAGE_CHECK_INTERVAL"] = 3600
+
+# Background Excel imports; a queued/running job not updated for this long
+# is treated as interrupted and can be resumed
+app.config["IMPORT_JOB_WORKERS"] = int(os.environ.get("IMPORT_JOB_WORKERS", 1))
+app.config["IMPORT_JOB_STALE_SECONDS"] = 600
+EXCEL_PHOTO_COLUMN = 7
+
+# Rendered catalogues are cached whole (see pdf_cache.py); 0 bytes disables it
+app.config["PDF_CACHE_DIR"] = os.path.join(app.instance_path, "pdf_cache")
+app.config["PDF_CACHE_MAX_BYTES"] = int(
+    os.environ.get("PDF_CACHE_MAX_BYTES", pdf_cache.DEFAULT_MAX_BYTES)
+)
+app.config["PDF_CACHE_MAX_ENTRIES"] = pdf_cache.DEFAULT_MAX_ENTRIES
+
+# Tile detail pages are rendered once into single-page PDFs and reused by
+# every catalogue (see page_fragments.py); 0 bytes disables them
+app.config["PAGE_FRAGMENT_DIR"] = os.path.join(app.instance_path, "page_fragments")
+app.config["PAGE_FRAGMENT_MAX_BYTES"] = int(
+    os.environ.get("PAGE_FRAGMENT_MAX_BYTES", 1024 * 1024 * 1024)
+)
+app.config["PAGE_FRAGMENT_MAX_ENTRIES"] = 20000
 
-# Folders (all under project root)
-os.makedirs(os.path.join(app.root_path, "static", "images"), exist_ok=True)
-os.makedirs(os.path.join(app.root_path, "static", "logo"), exist_ok=True)
-os.makedirs(os.path.join(app.root_path, "static", "posters"), exist_ok=True)
-os.makedirs(os.path.join(app.root_path, "static", "tile_templates"), exist_ok=True)
-os.makedirs(os.path.join(app.root_path, "uploads"), exist_ok=True)
+# Background PDF builds: worker threads and how long finished PDFs are kept
+app.config["PDF_JOB_DIR"] = os.path.join(app.instance_path, "pdf_jobs")
+app.config["PDF_JOB_WORKERS"] = int(os.environ.get("PDF_JOB_WORKERS", 2))
+app.config["PDF_JOB_TTL"] = int(os.environ.get("PDF_JOB_TTL", 3600))  # seconds
+
+# Batch exports (one selection, a catalogue per client): processes writing
+# the per-client files (unset = one per CPU core), and clients per batch
+app.config["PDF_BATCH_WORKERS"] = (
+    int(os.environ["PDF_BATCH_WORKERS"]) if os.environ.get("PDF_BATCH_WORKERS") else None
+)
+app.config["PDF_BATCH_MAX_CLIENTS"] = 500
+
+# GET /metrics answers loopback only unless METRICS_PUBLIC=1 (e.g. when the
+# scraper reaches gunicorn over the network)
+app.config["METRICS_PUBLIC"] = os.environ.get("METRICS_PUBLIC") == "1"
+
+# set by init_app once the database is reachable
+app.config["FTS_ENABLED"] = False
+
+db.init_app(app)
 
 POSTER_DIR = os.path.join(app.root_path, "static", "posters")
 TILE_TEMPLATE_DIR = os.path.join(app.root_path, "static", "tile_templates")
 
+# Backgrounds are resolved/decoded once per process and reloaded on mtime change.
+# Poster: prefer common names like cover.jpg / cover.png, else any jpg/png.
+# Template: ANY jpg/jpeg/png inside static/tile_templates.
+POSTER_ASSET = TemplateAsset(
+    "poster",
+    POSTER_DIR,
+    preferred_names=[
+        "cover.jpg", "cover.jpeg", "cover.png",
+        "Cover.jpg", "Cover.JPG", "IMG_1306.JPG",
+    ],
+)
+TILE_TEMPLATE_ASSET = TemplateAsset("tile_template", TILE_TEMPLATE_DIR)
+
+import_executor = ThreadPoolExecutor(
+    max_workers=app.config["IMPORT_JOB_WORKERS"], thread_name_prefix="import"
+)
+
+pdf_jobs = JobQueue(
+    app.config["PDF_JOB_DIR"],
+    workers=app.config["PDF_JOB_WORKERS"],
+    ttl=app.config["PDF_JOB_TTL"],
+)
+catalogue_cache = pdf_cache.PdfCache(
+    app.config["PDF_CACHE_DIR"],
+    max_bytes=app.config["PDF_CACHE_MAX_BYTES"],
+    max_entries=app.config["PDF_CACHE_MAX_ENTRIES"],
+)
+fragment_cache = pdf_cache.PdfCache(
+    app.config["PAGE_FRAGMENT_DIR"],
+    max_bytes=app.config["PAGE_FRAGMENT_MAX_BYTES"],
+    max_entries=app.config["PAGE_FRAGMENT_MAX_ENTRIES"],
+)
+
+# Tile photo box on a detail page: 70% x 65% of A4, centered
+TILE_IMAGE_BOX = (A4[0] * 0.70, A4[1] * 0.65)
+
+# Catalogue layouts -> tiles per row: "detail" is one tile per page on the
+# pamphlet template, the grids are pdf_generator's cards
+PDF_LAYOUTS = {"detail": 1, "grid2": 2, "grid3": 3}
+DEFAULT_PDF_LAYOUT = "detail"
+
+# batch exports with fewer clients write their files without a process pool
+BATCH_PARALLEL_MIN_CLIENTS = 4
+
 
 # ------------------------------------------------
 # Helpers
 # ------------------------------------------------
-def resolve_image_path(path: str | None) -> str | None:
-    """Convert stored path or web path to real filesystem path."""
-    if not path:
+def image_file_path(photo_path: str | None) -> str | None:
+    """
+    Filesystem path of a stored photo_path (see image_store.canonical_path).
+    Pure path arithmetic: files are checked when a tile is written and by
+    the periodic image check, never while rendering.
+    """
+    if not photo_path:
         return None
+    return os.path.join(app.root_path, os.path.normpath(photo_path))
 
-    # absolute path
-    if os.path.isabs(path) and os.path.exists(path):
-        return path
 
-    stripped = path.lstrip("/")
+def tile_image_path(tile) -> str | None:
+    """Photo file of `tile`, or None if it has none or it's flagged missing."""
+    if tile.image_missing:
+        return None
+    return image_file_path(tile.photo_path)
+
+
+def get_tile_image_derivative(img_path: str, box=TILE_IMAGE_BOX,
+                              profile: str = DEFAULT_PDF_PROFILE) -> str | None:
+    """Cached JPEG of a tile photo, pre-scaled to `box` (width, height in
+    points) at the resolution and quality of output `profile`."""
+    max_w, max_h = box
+    settings = app.config["PDF_PROFILES"][profile]
+    return image_cache.get_derivative(
+        app.config["IMAGE_CACHE_DIR"],
+        img_path,
+        max_w,
+        max_h,
+        dpi=settings["dpi"],
+        quality=settings["quality"],
+        max_bytes=app.config["IMAGE_CACHE_MAX_BYTES"],
+        sha=image_store.hash_from_path(img_path),
+    )
+
+
+@metrics.span("image_prepare")
+def prepare_tile_images(tiles, workers: int | None = None, box=TILE_IMAGE_BOX,
+                        profile: str = DEFAULT_PDF_PROFILE) -> int:
+    """
+    Pre-scale the photos of `tiles` to `box` for output `profile` in
+    parallel (see PDF_RENDER_WORKERS) so that drawing the pages only hits
+    the derivative cache.
+    """
+    max_w, max_h = box
+    settings = app.config["PDF_PROFILES"][profile]
+    src_paths = [tile_image_path(t) for t in tiles]
+    hashes = {p: image_store.hash_from_path(p) for p in src_paths if p}
+    return image_cache.prefetch_derivatives(
+        app.config["IMAGE_CACHE_DIR"],
+        src_paths,
+        max_w,
+        max_h,
+        dpi=settings["dpi"],
+        quality=settings["quality"],
+        max_bytes=app.config["IMAGE_CACHE_MAX_BYTES"],
+        workers=app.config["PDF_RENDER_WORKERS"] if workers is None else workers,
+        hashes={p: sha for p, sha in hashes.items() if sha},
+    )
 
-    # relative to project root
-    candidate = os.path.join(app.root_path, stripped)
-    if os.path.exists(candidate):
-        return candidate
 
-    # fallback: relative to current working dir
-    if os.path.exists(stripped):
-        return os.path.abspath(stripped)
+def get_poster_path() -> str | None:
+    """Cover-page poster (first page)."""
+    return POSTER_ASSET.path()
 
-    return None
 
+def get_tile_template_path() -> str | None:
+    """Tile-page template (grey pamphlet with logo)."""
+    return TILE_TEMPLATE_ASSET.path()
 
-def get_poster_path() -> str | None:
+
+# (asset form name, cache dir, dpi, quality) -> derivative path or None
+_background_memo: dict[tuple, str | None] = {}
+
+
+def background_image(asset: TemplateAsset, profile: str = DEFAULT_PDF_PROFILE) -> str | None:
     """
-    Cover-page poster (first page).
-    Prefer common names like cover.jpg / cover.png.
+    Cached JPEG of a full-page background scaled for output `profile`, or
+    None to embed the original (profiles without a background_dpi, or the
+    asset can't be read).
     """
-    if not os.path.isdir(POSTER_DIR):
+    settings = app.config["PDF_PROFILES"][profile]
+    dpi = settings["background_dpi"]
+    path = asset.path() if dpi else None
+    if not path:
         return None
+    # called for every page: resolve once per asset version and profile
+    # instead of re-hashing the asset file each time
+    memo_key = (asset.form_name(), app.config["IMAGE_CACHE_DIR"], dpi, settings["quality"])
+    if memo_key in _background_memo:
+        derivative = _background_memo[memo_key]
+        if derivative is None or os.path.exists(derivative):
+            return derivative
+    derivative = _background_memo[memo_key] = image_cache.get_derivative(
+        app.config["IMAGE_CACHE_DIR"],
+        path,
+        *A4,
+        dpi=dpi,
+        quality=settings["quality"],
+        max_bytes=app.config["IMAGE_CACHE_MAX_BYTES"],
+    )
+    return derivative
+
+
+_init_lock = threading.Lock()
+_initialised = False
+
+
+def init_app():
+    """
+    Logging, folders and an up-to-date schema (create_all + migrations).
+    Importing this module does none of it: wsgi.py, `python app.py` and
+    cli.py call this first, and the first request does it otherwise.
+    Calling it again is a no-op.
+    """
+    global _initialised
+    if _initialised:
+        return
+    with _init_lock:
+        if _initialised:
+            return
+        # LOG_LEVEL=DEBUG also shows per-document details (e.g. which poster file)
+        logging.basicConfig(
+            level=os.environ.get("LOG_LEVEL", "INFO").upper(),
+            format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+        )
+        logging.getLogger("PIL").setLevel(logging.INFO)   # per-chunk debug noise
 
-    preferred_names = [
-        "cover.jpg", "cover.jpeg", "cover.png",
-        "Cover.jpg", "Cover.JPG", "IMG_1306.JPG",
-    ]
-    for name in preferred_names:
-        candidate = os.path.join(POSTER_DIR, name)
-        if os.path.exists(candidate):
-            print("Poster found (preferred):", candidate)
-            return candidate
+        # Folders (all under project root, plus the instance folder for the DB)
+        os.makedirs(app.instance_path, exist_ok=True)
+        for folder in ("images", "logo", "posters", "tile_templates"):
+            os.makedirs(os.path.join(app.root_path, "static", folder), exist_ok=True)
+        os.makedirs(os.path.join(app.root_path, "uploads"), exist_ok=True)
+
+        with app.app_context():
+            database.configure_engine(db.engine)
+            db.create_all()
+            migrations.upgrade(db.engine)
+            app.config["FTS_ENABLED"] = search_index.available(db.engine)
+        _initialised = True
 
-    # any jpg/png in posters
-    for fname in os.listdir(POSTER_DIR):
-        lower = fname.lower()
-        if lower.endswith((".jpg", ".jpeg", ".png")):
-            candidate = os.path.join(POSTER_DIR, fname)
-            print("Poster found (fallback):", candidate)
-            return candidate
 
-    print("No poster image found in:", POSTER_DIR)
-    return None
+# ------------------------------------------------
+# Content-addressed tile images
+# ------------------------------------------------
+IMAGES_DIR = image_file_path(image_store.STORED_DIR)
 
 
-def get_tile_template_path() -> str | None:
+def stored_image_paths(filename: str) -> tuple[str, str]:
+    """(photo_path, web_path) for a file in static/images."""
+    photo_path = f"{image_store.STORED_DIR}/{filename}"
+    return photo_path, "/" + photo_path
+
+
+def set_tile_image(tile: "Tile", filename: str | None):
+    """Point `tile` at a photo in static/images, checking the file once here
+    so rendering never has to."""
+    if not filename:
+        tile.photo_path = tile.web_path = None
+        tile.image_missing = False
+        return
+    tile.photo_path, tile.web_path = stored_image_paths(filename)
+    tile.image_missing = not os.path.isfile(image_file_path(tile.photo_path))
+
+
+def add_image_ref(sha: str):
+    """
+    Count one more tile using the stored photo `sha` (caller commits).
+    A single upsert, so imports running side by side can't both try to
+    create the same ImageBlob row.
+    """
+    insert = sqlite_insert if db.engine.dialect.name == "sqlite" else pg_insert
+    stmt = insert(ImageBlob).values(
+        sha256=sha,
+        filename=image_store.stored_name(sha),
+        ref_count=1,
+        created_at=datetime.utcnow(),
+    )
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=[ImageBlob.sha256],
+        set_={"ref_count": ImageBlob.ref_count + 1, "released_at": None},
+    ))
+
+
+def reuse_stored_image(sha: str) -> bool:
     """
-    Tile-page template (grey pamphlet with logo).
-    Will pick ANY jpg/jpeg/png inside static/tile_templates.
+    Pin stored photo `sha` before a new tile reference to it is committed:
+    if no tile uses it, its sweep grace period starts again now, in a
+    transaction of its own so the sweeper sees it at once. Returns False if
+    the photo isn't stored (any more); its file has to be written again.
     """
-    if not os.path.isdir(TILE_TEMPLATE_DIR):
-        print("Tile template dir does not exist:", TILE_TEMPLATE_DIR)
+    with db.engine.begin() as conn:
+        return conn.execute(
+            update(ImageBlob)
+            .where(ImageBlob.sha256 == sha)
+            .values(released_at=case(
+                (ImageBlob.ref_count <= 0, datetime.utcnow()), else_=ImageBlob.released_at
+            ))
+        ).rowcount > 0
+
+
+def image_key_for_path(path: str) -> str | None:
+    """Content key of a photo: the stored hash, or the file hash for legacy files."""
+    sha = image_store.hash_from_path(path)
+    if sha:
+        return sha
+    try:
+        return image_cache.file_sha256(path)
+    except OSError:
         return None
 
-    for fname in os.listdir(TILE_TEMPLATE_DIR):
-        lower = fname.lower()
-        if lower.endswith((".jpg", ".jpeg", ".png")):
-            candidate = os.path.join(TILE_TEMPLATE_DIR, fname)
-            print("Tile template found:", candidate)
-            return candidate
 
-    print("No tile template image found in:", TILE_TEMPLATE_DIR)
-    return None
+def write_stored_image(data: bytes, dest: str, sha: str) -> float:
+    """Normalise photo bytes into `dest` and build its grid thumbnails.
+    Returns seconds spent (import timings)."""
+    start = time.perf_counter()
+    save_normalised(data, dest, app.config["STORED_IMAGE_MAX_PX"])
+    thumbnails.build_thumbnails(dest, app.config["THUMBS_DIR"], sha)
+    return time.perf_counter() - start
+
+
+def store_tile_image(data: bytes) -> str:
+    """
+    Store uploaded photo bytes, reusing the existing file if the same bytes
+    were stored before. Adds a reference; returns the stored filename.
+    """
+    sha = image_store.content_hash(data)
+    filename = image_store.stored_name(sha)
+    dest = os.path.join(IMAGES_DIR, filename)
+    if not (os.path.exists(dest) and reuse_stored_image(sha)):
+        write_stored_image(data, dest, sha)
+    add_image_ref(sha)
+    return filename
+
+
+def remove_image_file(path: str):
+    """Delete a photo, its thumbnails and its cached PDF derivatives."""
+    try:
+        if os.path.exists(path):
+            # thumbnails and derivatives are both named by the content key
+            key = image_key_for_path(path)
+            if key:
+                thumbnails.evict(app.config["THUMBS_DIR"], key)
+                image_cache.evict_hash(app.config["IMAGE_CACHE_DIR"], key)
+            os.remove(path)
+    except Exception as e:
+        log.warning("Error removing image %s: %s", path, e)
+
+
+def sweep_image_files() -> int:
+    """
+    Remove photo files no tile uses any more: stored photos whose reference
+    count has been 0 for the grace period, and legacy files queued in
+    OrphanFile. Returns files removed.
+
+    A stored photo's file is removed while its row's delete is still
+    uncommitted, so an import picking the photo up again
+    (reuse_stored_image) waits for the sweep and then writes the file anew.
+    Its grace period counts from its release or the last such reuse.
+    """
+    removed = 0
+    with app.app_context():
+        cutoff = datetime.utcnow() - timedelta(seconds=app.config["IMAGE_SWEEP_GRACE_SECONDS"])
+        blobs = (
+            ImageBlob.query
+            .filter(ImageBlob.ref_count <= 0, ImageBlob.released_at < cutoff)
+            .limit(500)
+            .all()
+        )
+        for sha, filename in [(b.sha256, b.filename) for b in blobs]:
+            # conditional: skip it if an upload re-referenced or reused it meanwhile
+            claimed = db.session.execute(
+                delete(ImageBlob).where(
+                    ImageBlob.sha256 == sha,
+                    ImageBlob.ref_count <= 0,
+                    ImageBlob.released_at < cutoff,
+                )
+            ).rowcount
+            if claimed:
+                remove_image_file(os.path.join(IMAGES_DIR, filename))
+                removed += 1
+            db.session.commit()
+
+        orphans = OrphanFile.query.order_by(OrphanFile.id).limit(500).all()
+        for orphan_id, path in [(o.id, o.path) for o in orphans]:
+            claimed = db.session.execute(
+                delete(OrphanFile).where(OrphanFile.id == orphan_id)
+            ).rowcount
+            still_used = Tile.query.filter_by(photo_path=path).first() is not None
+            db.session.commit()
+            if claimed and not still_used:
+                remove_image_file(image_file_path(path))
+                removed += 1
+    return removed
+
+
+def check_tile_images() -> int:
+    """
+    Re-check every tile's photo file and update its image_missing flag, so
+    renders skip photos that vanished (or pick up ones restored) without
+    probing the disk themselves. Returns tiles currently missing a photo.
+    """
+    with app.app_context():
+        flips = {True: [], False: []}
+        missing_count = 0
+        rows = (
+            db.session.query(Tile.id, Tile.photo_path, Tile.image_missing)
+            .filter(Tile.photo_path.isnot(None))
+            .yield_per(500)
+        )
+        for tile_id, photo_path, was_missing in rows:
+            missing = not os.path.isfile(image_file_path(photo_path))
+            missing_count += missing
+            if missing != bool(was_missing):
+                flips[missing].append(tile_id)
+
+        for missing, ids in flips.items():
+            if ids:
+                db.session.execute(
+                    update(Tile).where(Tile.id.in_(ids)).values(image_missing=missing)
+                )
+        db.session.commit()
+        if flips[True] or flips[False]:
+            catalogue_cache.invalidate_tiles(flips[True] + flips[False])
+            fragment_cache.invalidate_tiles(flips[True] + flips[False])
+        if flips[True]:
+            log.warning("Image check: %d tile photo(s) went missing", len(flips[True]))
+    return missing_count
+
+
+image_sweeper = PeriodicTask(
+    "image-sweeper", sweep_image_files, app.config["IMAGE_SWEEP_INTERVAL"]
+)
+image_checker = PeriodicTask(
+    "image-check", check_tile_images, app.config["IMAGE_CHECK_INTERVAL"]
+)
+
+
+@app.before_request
+def start_background_tasks():
+    init_app()
+    image_sweeper.start()
+    image_checker.start()
 
 
 # ------------------------------------------------
-# Model
-# NOTE: 'tags' column is now used as FINISH (e.g. GLOSSY, MATT)
+# Metrics
+#   every response gets a Server-Timing header summing the request's spans
+#   (see metrics.py); GET /metrics -> Prometheus text format
+#   /metrics names every endpoint and its timings, so it only answers
+#   requests from this host (127.0.0.1/::1) that didn't come through a
+#   proxy (no X-Forwarded-For); anything else gets a 404. Set
+#   METRICS_PUBLIC=1 to serve it to every client.
 # ------------------------------------------------
-class Tile(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(200))
-    sku = db.Column(db.String(100))      # kept in DB but not used in UI
-    size = db.Column(db.String(100))
-    price = db.Column(db.String(100))    # kept in DB but not used in UI
-    description = db.Column(db.String(500))
-    tags = db.Column(db.String(500))     # used as FINISH
-    photo_path = db.Column(db.String(500))
-    web_path = db.Column(db.String(500))
+@app.before_request
+def start_request_timing():
+    metrics.begin_request()
+    g.request_started = time.perf_counter()
+
+
+@app.after_request
+def add_server_timing(response):
+    spans = metrics.end_request()
+    started = g.get("request_started")
+    if started is not None:
+        total = time.perf_counter() - started
+        metrics.REQUESTS.observe(request.endpoint or "unmatched", total)
+        response.headers["Server-Timing"] = metrics.server_timing(spans, total)
+    return response
 
 
-with app.app_context():
-    db.create_all()
+@app.route("/metrics")
+def metrics_endpoint():
+    if not app.config["METRICS_PUBLIC"] and (
+        request.remote_addr not in ("127.0.0.1", "::1")
+        or "X-Forwarded-For" in request.headers
+    ):
+        return "Not found", 404
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+
+# ------------------------------------------------
+# Thumbnails for the catalogue grid
+#   /tiles/<id>/thumb/<width>?v=<content key>
+# ------------------------------------------------
+def tile_image_key(tile: "Tile") -> str | None:
+    path = tile_image_path(tile)
+    return image_key_for_path(path) if path else None
+
+
+@app.template_global()
+def thumb_url(tile: "Tile", width: int) -> str | None:
+    key = tile_image_key(tile)
+    if not key:
+        return None
+    return f"/tiles/{tile.id}/thumb/{thumbnails.pick_width(width)}?v={key[:16]}"
+
+
+@app.template_global()
+def thumb_srcset(tile: "Tile") -> str:
+    key = tile_image_key(tile)
+    if not key:
+        return ""
+    return ", ".join(
+        f"/tiles/{tile.id}/thumb/{w}?v={key[:16]} {w}w" for w in thumbnails.THUMB_WIDTHS
+    )
+
+
+@app.route("/tiles/<int:tile_id>/thumb/<int:width>")
+def tile_thumbnail(tile_id, width):
+    tile = db.session.get(Tile, tile_id)
+    if not tile:
+        return "Tile not found", 404
+
+    src = tile_image_path(tile)
+    key = image_key_for_path(src) if src else None
+    if not key:
+        return "Image not found", 404
+
+    width = thumbnails.pick_width(width)
+    try:
+        path = thumbnails.get_thumbnail(src, app.config["THUMBS_DIR"], key, width)
+    except Exception as e:
+        log.warning("Thumbnail error for tile %s: %s", tile_id, e)
+        return "Image not readable", 404
+
+    rv = send_file(
+        path,
+        mimetype="image/jpeg",
+        etag=f"{key[:16]}-{width}",
+        max_age=app.config["THUMB_MAX_AGE"],
+        conditional=True,
+    )
+    rv.cache_control.public = True
+    rv.cache_control.immutable = True
+    return rv
 
 
 # ------------------------------------------------
@@ -136,8 +656,148 @@ with app.app_context():
 # ------------------------------------------------
 @app.route("/")
 def home():
-    tiles = Tile.query.order_by(Tile.id.desc()).all()
-    return render_template("index.html", tiles=tiles)
+    # cards are loaded page by page from /api/tiles
+    total = Tile.query.count()
+    finishes = [
+        f for (f,) in db.session.query(Tile.tags).distinct().order_by(Tile.tags) if f
+    ]
+    return render_template("index.html", total=total, finishes=finishes)
+
+
+# ------------------------------------------------
+# Catalogue query API (keyset pagination)
+#   GET /api/tiles?q=&size=&finish=&sort=latest|oldest|az|za&cursor=&limit=
+# ------------------------------------------------
+TILE_PAGE_SIZE = 60
+TILE_PAGE_MAX = 200
+TILE_SORTS = ("latest", "oldest", "az", "za")
+
+
+def encode_cursor(values) -> str:
+    raw = json.dumps(values, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        return json.loads(raw)
+    except Exception:
+        return None
+
+
+def query_tiles(args) -> tuple[list["Tile"], str | None]:
+    """
+    One page of tiles for the given filters. Every filter and sort is
+    backed by an index (name / size / tags / primary key); pages continue
+    from an opaque cursor, so deep pages cost the same as the first.
+    """
+    sort = args.get("sort", "latest")
+    if sort not in TILE_SORTS:
+        sort = "latest"
+    limit = min(max(args.get("limit", TILE_PAGE_SIZE, type=int) or TILE_PAGE_SIZE, 1), TILE_PAGE_MAX)
+
+    query = Tile.query
+
+    q = (args.get("q") or "").strip()
+    match = search_index.match_expression(q) if app.config["FTS_ENABLED"] else None
+    if match:
+        # full-text: every word in name / description / finish / size
+        query = query.filter(
+            text("tile.id IN (" + search_index.matching_ids_sql() + ")")
+        ).params(match=match)
+    elif q:
+        # name (stored uppercase) or size prefix, as index ranges
+        name = q.upper()
+        query = query.filter(or_(
+            and_(Tile.name >= name, Tile.name < name + "\uffff"),
+            and_(Tile.size >= q, Tile.size < q + "\uffff"),
+        ))
+
+    size = (args.get("size") or "").strip()
+    if size:
+        query = query.filter(Tile.size == size)
+
+    finish = (args.get("finish") or "").strip().upper()
+    if finish:
+        query = query.filter(Tile.tags == finish)
+
+    cursor = decode_cursor(args.get("cursor") or "")
+    if sort == "latest":
+        if isinstance(cursor, int):
+            query = query.filter(Tile.id < cursor)
+        query = query.order_by(Tile.id.desc())
+    elif sort == "oldest":
+        if isinstance(cursor, int):
+            query = query.filter(Tile.id > cursor)
+        query = query.order_by(Tile.id.asc())
+    else:
+        if isinstance(cursor, list) and len(cursor) == 2:
+            name, tid = cursor
+            if sort == "az":
+                query = query.filter(or_(Tile.name > name, and_(Tile.name == name, Tile.id > tid)))
+            else:
+                query = query.filter(or_(Tile.name < name, and_(Tile.name == name, Tile.id < tid)))
+        if sort == "az":
+            query = query.order_by(Tile.name.asc(), Tile.id.asc())
+        else:
+            query = query.order_by(Tile.name.desc(), Tile.id.desc())
+
+    tiles = query.limit(limit + 1).all()
+    next_cursor = None
+    if len(tiles) > limit:
+        tiles = tiles[:limit]
+        last = tiles[-1]
+        next_cursor = encode_cursor(last.id if sort in ("latest", "oldest") else [last.name or "", last.id])
+    return tiles, next_cursor
+
+
+def tile_json(tile: "Tile") -> dict:
+    return {
+        "id": tile.id,
+        "name": tile.name,
+        "size": tile.size,
+        "finish": tile.tags,
+        "description": tile.description,
+        "image": None if tile.image_missing else tile.web_path,
+        "created_at": tile.created_at.isoformat() if tile.created_at else None,
+        "thumb": thumb_url(tile, 320),
+        "srcset": thumb_srcset(tile),
+    }
+
+
+@app.route("/api/tiles")
+def api_tiles():
+    tiles, next_cursor = query_tiles(request.args)
+    return jsonify(tiles=[tile_json(t) for t in tiles], next_cursor=next_cursor)
+
+
+# ------------------------------------------------
+# Ranked full-text search (FTS5, see search_index.py)
+#   GET /api/search?q=desert bro&limit=&offset=
+# ------------------------------------------------
+@app.route("/api/search")
+def api_search():
+    q = (request.args.get("q") or "").strip()
+    limit = min(max(request.args.get("limit", 50, type=int) or 50, 1), TILE_PAGE_MAX)
+    offset = max(request.args.get("offset", 0, type=int) or 0, 0)
+
+    if not app.config["FTS_ENABLED"]:
+        return jsonify(error="Full-text search is not available"), 501
+    if not q:
+        return jsonify(tiles=[], next_offset=None)
+
+    hits = search_index.search(db.session, q, limit=limit + 1, offset=offset)
+    has_more = len(hits) > limit
+    hits = hits[:limit]
+
+    by_id = {t.id: t for t in Tile.query.filter(Tile.id.in_([tid for tid, _ in hits]))}
+    results = []
+    for tid, rank in hits:
+        tile = by_id.get(tid)
+        if tile:
+            results.append({**tile_json(tile), "rank": round(rank, 4)})
+    return jsonify(tiles=results, next_offset=offset + limit if has_more else None)
 
 
 # ------------------------------------------------
@@ -157,16 +817,14 @@ def upload_tile():
         description = request.form.get("description") or ""
 
         file = request.files.get("photo")
-        photo_path = None
-        web_path = None
+        filename = None
 
         if file and file.filename:
-            filename = f"{uuid.uuid4().hex}_{file.filename.replace(' ', '_')}"
-            save_path = os.path.join(app.root_path, "static", "images", filename)
-            file.save(save_path)
-
-            photo_path = save_path
-            web_path = "/static/images/" + filename
+            try:
+                filename = store_tile_image(file.read())
+            except Exception as e:
+                log.warning("Image upload error: %s", e)
+                return "Invalid image file", 400
 
         tile = Tile(
             name=name,
@@ -175,9 +833,8 @@ def upload_tile():
             price=None,                # not used
             description=description,
             tags=finish,               # FINISH stored in tags
-            photo_path=photo_path,
-            web_path=web_path,
         )
+        set_tile_image(tile, filename)
 
         db.session.add(tile)
         db.session.commit()
@@ -189,70 +846,231 @@ def upload_tile():
 # ------------------------------------------------
 # Excel import  (also uppercases NAME and FINISH)
 # ------------------------------------------------
-def import_excel_with_images(filepath: str):
-    wb = load_workbook(filepath, data_only=True)
-    ws = wb.active
+def import_excel_with_images(filepath: str, batch_size: int | None = None,
+                             job_id: str | None = None) -> dict:
+    """
+    Stream rows from the first sheet (read-only openpyxl) and commit tiles
+    in batches of `batch_size` (EXCEL_IMPORT_BATCH_SIZE), so memory stays
+    flat however large the sheet is.
+
+    Pictures in the photo column are read from the xlsx zip as their row is
+    reached and normalised (orient, cap size, JPEG) on a thread pool while
+    the next batch of rows is parsed; a batch is committed once its pictures
+    are written. Pictures are stored by content hash, so one already stored
+    (earlier in the sheet or by an earlier import) is reused, not processed
+    again. Returns row/image counts and per-stage timings.
+
+    With `job_id`, every row gets an ImportRow result and the ImportJob
+    counters are committed together with each batch; rows up to the job's
+    last_committed_row are skipped, so a failed import resumes where it
+    stopped.
+    """
+    batch_size = batch_size or app.config["EXCEL_IMPORT_BATCH_SIZE"]
+    stats = {"rows": 0, "imported": 0, "skipped": 0, "images": 0,
+             "images_reused": 0, "image_errors": 0}
+    timings = {"parse": 0.0, "images": 0.0, "image_wait": 0.0, "db": 0.0}
+    started = time.perf_counter()
+
+    # content hash -> future writing the stored file (None = already on disk)
+    stored = {}
+    timed = set()
+
+    resume_after = 1   # header row
+    if job_id:
+        resume_after = db.session.get(ImportJob, job_id).last_committed_row or 1
+
+    def flush(batch):
+        """Wait for the batch's pictures, then commit its tiles (and results)."""
+        if not batch:
+            return
+        t0 = time.perf_counter()
+        images_done = 0
+        for entry in batch:
+            tile, sha = entry["tile"], entry["sha"]
+            if sha is not None:
+                try:
+                    future = stored[sha]
+                    if future is not None:
+                        seconds = future.result()
+                        if sha not in timed:
+                            timings["images"] += seconds
+                            metrics.observe("image_normalise", seconds)
+                            timed.add(sha)
+                    set_tile_image(tile, image_store.stored_name(sha))
+                    add_image_ref(sha)
+                    images_done += 1
+                except Exception as e:
+                    stats["image_errors"] += 1
+                    entry["message"] = f"Image error: {e}"
+                    log.warning("Image import error (row %s): %s", entry["row"], e)
+            if tile is not None:
+                db.session.add(tile)
+        stats["images"] += images_done
+        elapsed = time.perf_counter() - t0
+        timings["image_wait"] += elapsed
+        metrics.observe("import_image_wait", elapsed)
+
+        t0 = time.perf_counter()
+        if job_id:
+            db.session.flush()   # assign tile ids for the row results
+            for entry in batch:
+                tile = entry["tile"]
+                db.session.add(ImportRow(
+                    job_id=job_id,
+                    row_number=entry["row"],
+                    status="imported" if tile is not None else "skipped",
+                    tile_id=tile.id if tile is not None else None,
+                    message=(entry["message"] or "")[:500] or None,
+                ))
+            job = db.session.get(ImportJob, job_id)
+            imported = sum(1 for e in batch if e["tile"] is not None)
+            job.rows_processed += len(batch)
+            job.rows_imported += imported
+            job.rows_skipped += len(batch) - imported
+            job.images_extracted += images_done
+            job.last_committed_row = batch[-1]["row"]
+        db.session.commit()
+        db.session.expunge_all()   # drop committed tiles from memory
+        elapsed = time.perf_counter() - t0
+        timings["db"] += elapsed
+        metrics.observe("db_commit", elapsed)
 
-    image_map = {}
-    for img in getattr(ws, "_images", []):
-        try:
-            anchor = img.anchor._from
-            cell = f"{anchor.col_ref}{anchor.row}"
-            image_map[cell] = img
-        except Exception:
-            continue
+    from openpyxl import load_workbook   # only imports need it; keeps startup light
 
-    for row in ws.iter_rows(min_row=2, values_only=False):
-        name = row[0].value if row[0] else None
-        sku = row[1].value if row[1] else None
-        size = row[2].value if row[2] else None
-        price = row[3].value if row[3] else None
-        description = row[4].value if row[4] else None
-        tags = row[5].value if row[5] else None   # FINISH here
+    wb = load_workbook(filepath, read_only=True, data_only=True)
+    images = XlsxImages(filepath)
+    pool = ThreadPoolExecutor(
+        max_workers=app.config["EXCEL_IMPORT_IMAGE_WORKERS"],
+        thread_name_prefix="excel-img",
+    )
+    previous, current = [], []
 
-        img_cell = row[6].coordinate if len(row) > 6 else None
-        img_obj = image_map.get(img_cell)
+    try:
+        ws = wb.active
+        t0 = time.perf_counter()
+        for row_idx, row in enumerate(ws.iter_rows(min_row=2, values_only=True), start=2):
+            if row_idx <= resume_after:
+                continue
+            row = tuple(row) + (None,) * (6 - len(row))
+            media = images.media_for(row_idx, EXCEL_PHOTO_COLUMN)
+            if not media and all(v is None or v == "" for v in row):
+                continue   # blank row
+            stats["rows"] += 1
+
+            name, sku, size, price, description, tags = row[:6]   # tags = FINISH
+            entry = {"row": row_idx, "tile": None, "sha": None, "message": None}
+
+            if not name:
+                entry["message"] = "Missing name"
+                stats["skipped"] += 1
+            else:
+                if media:
+                    try:
+                        img_bytes = images.read(media)
+                        sha = image_store.content_hash(img_bytes)
+                        if sha in stored:
+                            stats["images_reused"] += 1
+                        else:
+                            dest = os.path.join(IMAGES_DIR, image_store.stored_name(sha))
+                            if os.path.exists(dest) and reuse_stored_image(sha):
+                                stored[sha] = None
+                                stats["images_reused"] += 1
+                            else:
+                                stored[sha] = pool.submit(
+                                    write_stored_image, img_bytes, dest, sha
+                                )
+                        entry["sha"] = sha
+                    except Exception as e:
+                        stats["image_errors"] += 1
+                        entry["message"] = f"Image error: {e}"
+                        log.warning("Image import error (row %s): %s", row_idx, e)
+
+                # uppercase NAME and FINISH from Excel as well
+                name_str = str(name).upper()
+                finish_str = str(tags).upper() if tags is not None else None
+
+                entry["tile"] = Tile(
+                    name=name_str,
+                    sku=str(sku) if sku else None,
+                    size=str(size) if size else None,
+                    price=parse_price(price),
+                    description=str(description) if description else None,
+                    tags=finish_str,    # FINISH
+                )
+                stats["imported"] += 1
+            current.append(entry)
+
+            if len(current) >= batch_size:
+                elapsed = time.perf_counter() - t0
+                timings["parse"] += elapsed
+                metrics.observe("excel_parse", elapsed)
+                # the previous batch's pictures had a whole batch of parsing
+                # to finish in the background
+                flush(previous)
+                previous, current = current, []
+                t0 = time.perf_counter()
+
+        elapsed = time.perf_counter() - t0
+        timings["parse"] += elapsed
+        metrics.observe("excel_parse", elapsed)
+        flush(previous)
+        flush(current)
+    finally:
+        pool.shutdown(wait=True)
+        images.close()
+        wb.close()
+
+    timings["total"] = time.perf_counter() - started
+    stats["timings"] = {k: round(v, 3) for k, v in timings.items()}
+    log.info("Excel import: %s", stats)
+    return stats
 
-        photo_path = None
-        web_path = None
 
-        if img_obj:
-            try:
-                img_bytes = img_obj._data()
-                pil = Image.open(BytesIO(img_bytes))
-                filename = f"{uuid.uuid4().hex}.png"
-                save_path = os.path.join(app.root_path, "static", "images", filename)
-                pil.save(save_path)
-
-                photo_path = save_path
-                web_path = "/static/images/" + filename
-            except Exception as e:
-                print("Image import error:", e)
-
-        if name:
-            # uppercase NAME and FINISH from Excel as well
-            name_str = str(name).upper()
-            finish_str = str(tags).upper() if tags is not None else None
-
-            tile = Tile(
-                name=name_str,
-                sku=str(sku) if sku else None,
-                size=str(size) if size else None,
-                price=str(price) if price else None,
-                description=str(description) if description else None,
-                tags=finish_str,    # FINISH
-                photo_path=photo_path,
-                web_path=web_path
-            )
-            db.session.add(tile)
+# ------------------------------------------------
+# Excel import as a background job
+#   POST /upload_excel                -> queues an ImportJob
+#   GET  /import_jobs/<id>            -> counters + state
+#   GET  /import_jobs/<id>/rows       -> per-row results
+#   POST /import_jobs/<id>/resume     -> continue a failed import
+# ------------------------------------------------
+def run_import_job(job_id: str):
+    with app.app_context():
+        job = db.session.get(ImportJob, job_id)
+        job.state = "running"
+        job.error = None
+        db.session.commit()
+        file_path = job.file_path
+
+        try:
+            import_excel_with_images(file_path, job_id=job_id)
+        except Exception as e:
+            log.exception("Import job %s failed", job_id)
+            db.session.rollback()
+            job = db.session.get(ImportJob, job_id)
+            job.state = "failed"
+            job.error = str(e)[:1000]
+            db.session.commit()
+            return
+
+        job = db.session.get(ImportJob, job_id)
+        job.state = "done"
+        db.session.commit()
 
-    db.session.commit()
+
+def import_job_can_resume(job: ImportJob) -> bool:
+    if job.state == "failed":
+        return True
+    if job.state in ("queued", "running") and job.updated_at:
+        # the process running it died
+        age = (datetime.utcnow() - job.updated_at).total_seconds()
+        return age > app.config["IMPORT_JOB_STALE_SECONDS"]
+    return False
 
 
 @app.route("/upload_excel", methods=["GET", "POST"])
 def upload_excel():
     if request.method == "GET":
-        return render_template("upload_excel.html")
+        return render_template("upload_excel.html", job_id=request.args.get("job"))
 
     file = request.files.get("excel_file")
     if not file:
@@ -262,9 +1080,72 @@ def upload_excel():
     filename = f"{uuid.uuid4().hex}_{file.filename}"
     save_path = os.path.join(app.root_path, "uploads", filename)
     file.save(save_path)
-    import_excel_with_images(save_path)
-    flash("Excel imported successfully")
-    return redirect("/")
+
+    job = ImportJob(id=uuid.uuid4().hex, file_path=save_path, original_name=file.filename)
+    db.session.add(job)
+    db.session.commit()
+    import_executor.submit(run_import_job, job.id)
+    return redirect(f"/upload_excel?job={job.id}")
+
+
+@app.route("/import_jobs/<job_id>")
+def import_job_status(job_id):
+    job = db.session.get(ImportJob, job_id)
+    if not job:
+        return jsonify(error="Job not found"), 404
+
+    return jsonify(
+        job_id=job.id,
+        file=job.original_name,
+        state=job.state,
+        rows_processed=job.rows_processed,
+        rows_imported=job.rows_imported,
+        rows_skipped=job.rows_skipped,
+        images_extracted=job.images_extracted,
+        last_committed_row=job.last_committed_row,
+        error=job.error,
+        can_resume=import_job_can_resume(job),
+    )
+
+
+@app.route("/import_jobs/<job_id>/rows")
+def import_job_rows(job_id):
+    if not db.session.get(ImportJob, job_id):
+        return jsonify(error="Job not found"), 404
+
+    status = request.args.get("status")
+    offset = request.args.get("offset", 0, type=int)
+    limit = min(request.args.get("limit", 500, type=int), 5000)
+
+    query = ImportRow.query.filter_by(job_id=job_id)
+    if status:
+        query = query.filter_by(status=status)
+    rows = query.order_by(ImportRow.row_number).offset(offset).limit(limit).all()
+    return jsonify(rows=[
+        {
+            "row": r.row_number,
+            "status": r.status,
+            "tile_id": r.tile_id,
+            "message": r.message,
+        }
+        for r in rows
+    ])
+
+
+@app.route("/import_jobs/<job_id>/resume", methods=["POST"])
+def resume_import_job(job_id):
+    job = db.session.get(ImportJob, job_id)
+    if not job:
+        return jsonify(error="Job not found"), 404
+    if not import_job_can_resume(job):
+        return jsonify(error=f"Job is {job.state}"), 409
+    if not os.path.exists(job.file_path):
+        return jsonify(error="Uploaded file is gone"), 410
+
+    job.state = "queued"
+    db.session.commit()
+    import_executor.submit(run_import_job, job.id)
+    return jsonify(job_id=job.id, state=job.state), 202
 
 
 # ------------------------------------------------
@@ -276,52 +1157,64 @@ def delete_tiles():
     if not ids:
         return redirect("/")
 
+    tile_ids = []
     for raw_id in ids:
         try:
-            tid = int(raw_id)
+            tile_ids.append(int(raw_id))
         except ValueError:
             continue
+    if not tile_ids:
+        return redirect("/")
 
-        tile = Tile.query.get(tid)
-        if not tile:
-            continue
-
-        if tile.photo_path:
-            try:
-                p = resolve_image_path(tile.photo_path)
-                if p and os.path.exists(p):
-                    os.remove(p)
-            except Exception as e:
-                print("Error removing image:", e)
+    # one query for the photos, one statement for the rows
+    rows = db.session.query(Tile.photo_path).filter(Tile.id.in_(tile_ids)).all()
+    released = Counter()
+    legacy_paths = []
+    for (photo_path,) in rows:
+        sha = image_store.hash_from_path(photo_path)
+        if sha:
+            released[sha] += 1
+        elif photo_path:
+            legacy_paths.append(photo_path)
+
+    Tile.query.filter(Tile.id.in_(tile_ids)).delete(synchronize_session=False)
+
+    # drop photo references in the same transaction; files go later
+    now = datetime.utcnow()
+    for sha, count in released.items():
+        remaining = ImageBlob.ref_count - count
+        db.session.execute(
+            update(ImageBlob)
+            .where(ImageBlob.sha256 == sha)
+            .values(
+                ref_count=remaining,
+                released_at=case((remaining <= 0, now), else_=ImageBlob.released_at),
+            )
+        )
+    db.session.add_all(OrphanFile(path=p) for p in legacy_paths)
+    db.session.commit()
 
-        db.session.delete(tile)
+    catalogue_cache.invalidate_tiles(tile_ids)
+    fragment_cache.invalidate_tiles(tile_ids)
 
-    db.session.commit()
+    image_sweeper.wake()
     return redirect("/")
 
 
 # ------------------------------------------------
 # PDF helpers
 # ------------------------------------------------
-def draw_cover_page(c: canvas.Canvas, client_name: str | None = None):
+@metrics.span("cover_draw")
+def draw_cover_page(c: canvas.Canvas, client_name: str | None = None,
+                    profile: str = DEFAULT_PDF_PROFILE):
     """Cover page: full poster + client name on green band."""
     w, h = A4
-    poster_path = get_poster_path()
 
     # full-page poster
-    if poster_path:
-        try:
-            c.drawImage(
-                ImageReader(poster_path),
-                0,
-                0,
-                width=w,
-                height=h,
-                preserveAspectRatio=False,
-                anchor="sw",
-            )
-        except Exception as e:
-            print("Poster draw error:", e)
+    try:
+        POSTER_ASSET.draw(c, w, h, background_image(POSTER_ASSET, profile))
+    except Exception as e:
+        log.warning("Poster draw error: %s", e)
 
     # client name on green band
     if client_name:
@@ -336,7 +1229,8 @@ def draw_cover_page(c: canvas.Canvas, client_name: str | None = None):
         c.setFillColorRGB(0, 0, 0)
 
 
-def draw_tile_detail_page(c: canvas.Canvas, tile: Tile):
+@metrics.span("page_draw")
+def draw_tile_detail_page(c: canvas.Canvas, tile: Tile, profile: str = DEFAULT_PDF_PROFILE):
     """
     Single tile page using grey template:
       - Template image as full background
@@ -348,40 +1242,30 @@ def draw_tile_detail_page(c: canvas.Canvas, tile: Tile):
     """
     w, h = A4
 
-    # background template
-    tpl_path = get_tile_template_path()
-    if tpl_path:
-        try:
-            c.drawImage(
-                ImageReader(tpl_path),
-                0,
-                0,
-                width=w,
-                height=h,
-                preserveAspectRatio=False,
-                anchor="sw",
-            )
-        except Exception as e:
-            print("Tile template draw error:", e)
-    else:
+    # background template (shared form XObject, stored once per PDF)
+    try:
+        has_template = TILE_TEMPLATE_ASSET.draw(c, w, h, background_image(TILE_TEMPLATE_ASSET, profile))
+    except Exception as e:
+        log.warning("Tile template draw error: %s", e)
+        has_template = False
+    if not has_template:
         # fallback plain dark background
         c.setFillColorRGB(0.26, 0.28, 0.33)
         c.rect(0, 0, w, h, fill=1, stroke=0)
         c.setFillColorRGB(0, 0, 0)
 
-    # --- IMPORTANT CHANGE HERE: prefer web_path over photo_path ---
-    img_path = resolve_image_path(tile.web_path or tile.photo_path)
-    print("DEBUG tile image:", tile.id, tile.web_path, tile.photo_path, "->", img_path)
+    img_path = tile_image_path(tile)
 
-    # tile image in center
+    # tile image in center (pre-scaled JPEG from the derivative cache; drawn
+    # by path so reportlab embeds the JPEG as-is without re-decoding it)
     if img_path:
         try:
-            max_w = w * 0.70
-            max_h = h * 0.65
+            max_w, max_h = TILE_IMAGE_BOX
             x = (w - max_w) / 2
             y = (h - max_h) / 2
+            scaled_path = get_tile_image_derivative(img_path, profile=profile)
             c.drawImage(
-                ImageReader(img_path),
+                scaled_path or ImageReader(img_path),
                 x,
                 y,
                 width=max_w,
@@ -390,7 +1274,7 @@ def draw_tile_detail_page(c: canvas.Canvas, tile: Tile):
                 anchor="sw",
             )
         except Exception as e:
-            print("Tile image draw error:", e)
+            log.warning("Tile image draw error (tile %s): %s", tile.id, e)
     else:
         c.setFont("Helvetica-Bold", 18)
         c.setFillColorRGB(1, 1, 1)
@@ -419,6 +1303,377 @@ def draw_tile_detail_page(c: canvas.Canvas, tile: Tile):
     c.setFillColorRGB(0, 0, 0)
 
 
+def pdf_file_name(pdf_name: str, default: str) -> str:
+    """Custom pdf file name from the user's input, else `default`."""
+    if pdf_name:
+        safe_name = pdf_name.replace(" ", "_")
+        if not safe_name.lower().endswith(".pdf"):
+            safe_name += ".pdf"
+        return safe_name
+    return default
+
+
+def new_pdf_buffer():
+    """In-memory buffer for a PDF that spills to a temp file when large."""
+    return tempfile.SpooledTemporaryFile(max_size=app.config["PDF_SPOOL_MAX_BYTES"])
+
+
+def send_pdf_buffer(buf, download_name: str):
+    """
+    Send a rendered PDF from `buf` (see new_pdf_buffer) as an attachment.
+    Small documents go out from memory with a Content-Length; documents that
+    spilled to disk are streamed with chunked transfer encoding.
+    """
+    size = buf.tell()
+    buf.seek(0)
+
+    if size <= app.config["PDF_SPOOL_MAX_BYTES"]:
+        data = BytesIO(buf.read())
+        buf.close()
+        return send_file(
+            data,
+            mimetype="application/pdf",
+            as_attachment=True,
+            download_name=download_name,
+        )
+
+    chunk_size = app.config["PDF_STREAM_CHUNK_BYTES"]
+
+    def generate():
+        try:
+            while True:
+                chunk = buf.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            buf.close()
+
+    rv = Response(generate(), mimetype="application/pdf", direct_passthrough=True)
+    rv.headers.set("Content-Disposition", "attachment", filename=download_name)
+    return rv
+
+
+def company_details() -> dict:
+    """Seller details for grid headers and footers ({} if none are set up),
+    as a plain dict that stays usable once the session is closed."""
+    company = Company.query.first()
+    return company.to_dict() if company else {}
+
+
+def render_catalogue_pdf(out, tiles, client_name: str | None = None, progress=None,
+                         workers: int | None = None, layout: str = DEFAULT_PDF_LAYOUT,
+                         profile: str = DEFAULT_PDF_PROFILE, company: dict | None = None):
+    """
+    Cover page followed by the tiles in `layout` (see PDF_LAYOUTS), with
+    images at the resolution of output `profile` (see PDF_PROFILES).
+    `out` is a file path or file-like object; `progress(done, total)` is
+    called after each tile. Tile photos are pre-scaled on `workers`
+    processes first; pages are then drawn serially in order. Grid layouts
+    print `company` (see company_details; looked up when None).
+    """
+    total = len(tiles) + 1
+    cols = PDF_LAYOUTS[layout]
+    if cols == 1 and app.config["PAGE_FRAGMENT_MAX_BYTES"]:
+        assemble_catalogue_pdf(out, tiles, client_name, progress, workers, profile=profile)
+        return
+
+    box = TILE_IMAGE_BOX if cols == 1 else pdf_generator.card_image_box(cols)
+    prepare_tile_images(tiles, workers, box, profile)
+    c = canvas.Canvas(out, pagesize=A4)
+
+    # cover
+    draw_cover_page(c, client_name, profile)
+    c.showPage()
+    if progress:
+        progress(1, total)
+
+    if cols > 1:
+        def card_image(t: dict) -> str | None:
+            path = image_file_path(t["photo_path"])
+            return get_tile_image_derivative(path, box, profile) if path else None
+
+        with metrics.span("grid_draw"):
+            pdf_generator.draw_tiles_grid(
+                c,
+                client_name,
+                tiles,
+                company_info=company_details() if company is None else company,
+                cols=cols,
+                image_path=card_image,
+                progress=(lambda done, _: progress(done + 1, total)) if progress else None,
+            )
+        with metrics.span("pdf_save"):
+            c.save()
+        return
+
+    # tiles pages
+    for idx, t in enumerate(tiles):
+        draw_tile_detail_page(c, t, profile)
+        if idx < len(tiles) - 1:
+            c.showPage()
+        if progress:
+            progress(idx + 2, total)
+
+    with metrics.span("pdf_save"):
+        c.save()
+
+
+def profile_key(profile: str) -> list:
+    """Cache key part for output `profile`: its name and its settings."""
+    return [profile, app.config["PDF_PROFILES"][profile]]
+
+
+def iter_batches(items, size: int):
+    """Lists of up to `size` items from any iterable."""
+    it = iter(items)
+    while batch := list(islice(it, size)):
+        yield batch
+
+
+def stream_catalogue_pdf(out, tiles, client_name: str | None = None,
+                         layout: str = DEFAULT_PDF_LAYOUT, profile: str = DEFAULT_PDF_PROFILE):
+    """
+    Same catalogue as render_catalogue_pdf, written to `out` page by page
+    (pdf_stream.StreamCanvas) so memory doesn't grow with its length.
+    `tiles` may be any iterable, e.g. a yield_per query; it is read once,
+    PDF_STREAM_BATCH tiles at a time, pre-scaling each batch's photos just
+    before its pages are drawn. Page fragments aren't used.
+    """
+    cols = PDF_LAYOUTS[layout]
+    box = TILE_IMAGE_BOX if cols == 1 else pdf_generator.card_image_box(cols)
+
+    def prescaled():
+        for batch in iter_batches(tiles, app.config["PDF_STREAM_BATCH"]):
+            prepare_tile_images(batch, box=box, profile=profile)
+            yield from batch
+
+    c = pdf_stream.StreamCanvas(out, pagesize=A4)
+    draw_cover_page(c, client_name, profile)
+    c.showPage()
+
+    if cols > 1:
+        def card_image(t: dict) -> str | None:
+            path = image_file_path(t["photo_path"])
+            return get_tile_image_derivative(path, box, profile) if path else None
+
+        with metrics.span("grid_draw"):
+            pdf_generator.draw_tiles_grid(
+                c, client_name, prescaled(), company_info=company_details(),
+                cols=cols, image_path=card_image,
+            )
+    else:
+        for t in prescaled():
+            draw_tile_detail_page(c, t, profile)
+            c.showPage()
+    c.save()
+
+
+def fragment_key(tile: Tile, profile: str = DEFAULT_PDF_PROFILE) -> str:
+    """Key of a tile's stored detail page."""
+    return pdf_cache.make_key({
+        "tile": tile.id,
+        "version": tile.version(),
+        "template": TILE_TEMPLATE_ASSET.version(),
+        "profile": profile_key(profile),
+    })
+
+
+def render_tile_fragment(out, tile: Tile, profile: str = DEFAULT_PDF_PROFILE):
+    """Single-page PDF of the tile's detail page, with the page template
+    left as a placeholder (page_fragments.assemble fills it in)."""
+    c = canvas.Canvas(out, pagesize=A4)
+    TILE_TEMPLATE_ASSET.draw_placeholder(c, *A4)
+    draw_tile_detail_page(c, tile, profile)
+    with metrics.span("pdf_save"):
+        c.save()
+
+
+def tile_fragment_paths(tiles, keys=None, progress=None,
+                        profile: str = DEFAULT_PDF_PROFILE) -> list[str]:
+    """
+    Stored detail page of each tile for output `profile`, rendering the
+    missing ones (their photos should be pre-scaled first, see
+    prepare_tile_images). `progress(done, total)` is called after each tile.
+    """
+    keys = keys or [fragment_key(t, profile) for t in tiles]
+    paths = []
+    for idx, (t, key) in enumerate(zip(tiles, keys)):
+        path = fragment_cache.get(key)
+        if path is None:
+            path = fragment_cache.store(
+                key, lambda dest, t=t: render_tile_fragment(dest, t, profile), [t.id]
+            )
+        paths.append(path)
+        if progress:
+            progress(idx + 1, len(tiles))
+    return paths
+
+
+def assemble_catalogue_pdf(out, tiles, client_name: str | None = None, progress=None,
+                           workers: int | None = None, with_cover: bool = True,
+                           profile: str = DEFAULT_PDF_PROFILE):
+    """
+    Detail-layout catalogue from stored page fragments: only the cover and
+    the pages of new or changed tiles are drawn; the rest is concatenation.
+    `with_cover=False` writes the tile pages alone (see render_client_batch).
+    """
+    first = 1 if with_cover else 0
+    total = len(tiles) + first
+    keys = [fragment_key(t, profile) for t in tiles]
+    missing = [t for t, key in zip(tiles, keys) if fragment_cache.get(key) is None]
+    prepare_tile_images(missing, workers, profile=profile)
+
+    cover = None
+    if with_cover:
+        cover = BytesIO()
+        c = canvas.Canvas(cover, pagesize=A4)
+        draw_cover_page(c, client_name, profile)
+        with metrics.span("pdf_save"):
+            c.save()
+        if progress:
+            progress(1, total)
+
+    # one page using the real template form, shared by all fragments
+    carrier = BytesIO()
+    c = canvas.Canvas(carrier, pagesize=A4)
+    try:
+        has_template = TILE_TEMPLATE_ASSET.draw(
+            c, *A4, background_image(TILE_TEMPLATE_ASSET, profile)
+        )
+    except Exception as e:
+        log.warning("Tile template draw error: %s", e)
+        has_template = False
+    c.save()
+
+    paths = tile_fragment_paths(
+        tiles, keys, progress=(lambda done, _: progress(done + first, total)) if progress else None,
+        profile=profile,
+    )
+
+    with metrics.span("pdf_assemble"):
+        page_fragments.assemble(
+            out,
+            cover,
+            paths,
+            carrier=carrier if has_template else None,
+            form_names=[TILE_TEMPLATE_ASSET.form_name()] if has_template else [],
+        )
+
+
+def catalogue_cache_key(tiles, client_name: str | None, layout: str,
+                        profile: str = DEFAULT_PDF_PROFILE) -> str:
+    """Key of a rendered catalogue: changes with anything that ends up on its pages."""
+    parts = {
+        "tiles": sorted((t.id, t.version()) for t in tiles),
+        "client": client_name or "",
+        "layout": layout,
+        "poster": POSTER_ASSET.version(),
+        "template": TILE_TEMPLATE_ASSET.version(),
+        "profile": profile_key(profile),
+    }
+    if PDF_LAYOUTS[layout] > 1:
+        # grid pages print the date and the company footer
+        parts["date"] = date.today().isoformat()
+        parts["company"] = company_details() or None
+    return pdf_cache.make_key(parts)
+
+
+def send_catalogue_pdf(tiles, client_name: str | None, layout: str, download_name: str,
+                       profile: str = DEFAULT_PDF_PROFILE):
+    """
+    Render (or reuse from catalogue_cache) and send a catalogue. The cache
+    key doubles as the ETag, so a repeated GET that already has the file
+    gets a 304 without anything being rendered. X-PDF-Size reports the
+    size of the document (also when it's streamed without a Content-Length).
+    """
+    if not app.config["PDF_CACHE_MAX_BYTES"]:
+        buf = new_pdf_buffer()
+        render_catalogue_pdf(buf, tiles, client_name, layout=layout, profile=profile)
+        size = buf.tell()
+        rv = send_pdf_buffer(buf, download_name)
+        rv.headers["X-PDF-Profile"] = profile
+        rv.headers["X-PDF-Size"] = str(size)
+        return rv
+
+    key = catalogue_cache_key(tiles, client_name, layout, profile)
+    if request.method in ("GET", "HEAD") and key in request.if_none_match:
+        rv = Response(status=304)
+        rv.set_etag(key)
+        return rv
+
+    path = catalogue_cache.get(key)
+    hit = path is not None
+    if not hit:
+        path = catalogue_cache.store(
+            key,
+            lambda out: render_catalogue_pdf(out, tiles, client_name, layout=layout,
+                                             profile=profile),
+            [t.id for t in tiles],
+        )
+
+    rv = send_file(
+        path,
+        mimetype="application/pdf",
+        as_attachment=True,
+        download_name=download_name,
+        etag=key,
+        max_age=0,
+    )
+    rv.headers["X-PDF-Cache"] = "hit" if hit else "miss"
+    rv.headers["X-PDF-Profile"] = profile
+    rv.headers["X-PDF-Size"] = str(os.path.getsize(path))
+    return rv
+
+
+def send_streamed_catalogue(tile_ids: list[int], client_name: str | None, layout: str,
+                            download_name: str, profile: str = DEFAULT_PDF_PROFILE):
+    """
+    Send a catalogue while it is being drawn: a render thread reads the
+    tiles through a server-side cursor (yield_per) and writes the pages
+    with stream_catalogue_pdf; each finished page goes out to the client.
+    The size isn't known up front (no Content-Length / X-PDF-Size) and the
+    catalogue cache is bypassed.
+    """
+    def render(out):
+        with app.app_context():
+            tiles = (
+                Tile.query.filter(Tile.id.in_(tile_ids))
+                .order_by(Tile.id.desc())
+                .yield_per(app.config["PDF_STREAM_BATCH"])
+            )
+            try:
+                stream_catalogue_pdf(out, tiles, client_name, layout, profile)
+            except pdf_stream.StreamClosed:
+                raise
+            except Exception:
+                log.exception("Streamed catalogue failed after it was started")
+                raise
+
+    chunks = pdf_stream.iter_chunks(render, app.config["PDF_STREAM_CHUNK_BYTES"])
+    rv = Response(chunks, mimetype="application/pdf", direct_passthrough=True)
+    rv.headers.set("Content-Disposition", "attachment", filename=download_name)
+    rv.headers["X-PDF-Profile"] = profile
+    return rv
+
+
+def parse_tile_ids(raw_ids) -> list[int] | None:
+    try:
+        return [int(i) for i in raw_ids]
+    except Exception:
+        return None
+
+
+def parse_layout(raw: str | None) -> str | None:
+    layout = (raw or "").strip().lower() or DEFAULT_PDF_LAYOUT
+    return layout if layout in PDF_LAYOUTS else None
+
+
+def parse_profile(raw: str | None) -> str | None:
+    profile = (raw or "").strip().lower() or DEFAULT_PDF_PROFILE
+    return profile if profile in app.config["PDF_PROFILES"] else None
+
+
 # ------------------------------------------------
 # PDF: Single tile
 # ------------------------------------------------
@@ -430,31 +1685,16 @@ def generate_pdf(tile_id):
 
     client_name = request.args.get("client_name", "").strip() or None
     pdf_name = request.args.get("pdf_name", "").strip()
+    profile = parse_profile(request.args.get("profile"))
+    if profile is None:
+        return "Invalid profile", 400
 
-    # custom pdf file name
-    if pdf_name:
-        safe_name = pdf_name.replace(" ", "_")
-        if not safe_name.lower().endswith(".pdf"):
-            safe_name += ".pdf"
-        pdf_path = safe_name
-    else:
-        pdf_path = f"tile_{tile_id}.pdf"
-
-    c = canvas.Canvas(pdf_path, pagesize=A4)
-
-    # cover
-    draw_cover_page(c, client_name)
-    c.showPage()
-
-    # tile page
-    draw_tile_detail_page(c, tile)
-
-    c.save()
-    return send_file(pdf_path, as_attachment=True)
+    return send_catalogue_pdf([tile], client_name, DEFAULT_PDF_LAYOUT,
+                              pdf_file_name(pdf_name, f"tile_{tile_id}.pdf"), profile)
 
 
 # ------------------------------------------------
-# PDF: Multiple tiles
+# PDF: Multiple tiles (stream=1: sent page by page while it's drawn)
 # ------------------------------------------------
 @app.route("/generate_pdf_multiple", methods=["POST"])
 def generate_pdf_multiple():
@@ -462,42 +1702,326 @@ def generate_pdf_multiple():
     client_name = request.form.get("client_name", "").strip() or None
     pdf_name = request.form.get("pdf_name", "").strip()
 
-    try:
-        tile_ids = [int(i) for i in tile_ids]
-    except Exception:
+    layout = parse_layout(request.form.get("layout"))
+    profile = parse_profile(request.form.get("profile"))
+
+    tile_ids = parse_tile_ids(tile_ids)
+    if tile_ids is None:
         return "Invalid tile ids", 400
+    if layout is None:
+        return "Invalid layout", 400
+    if profile is None:
+        return "Invalid profile", 400
+
+    if request.form.get("stream"):
+        # very large catalogues: pages go out as they are drawn
+        if not db.session.query(Tile.id).filter(Tile.id.in_(tile_ids)).first():
+            return "No tiles selected", 400
+        return send_streamed_catalogue(tile_ids, client_name, layout,
+                                       pdf_file_name(pdf_name, "tiles_selected.pdf"), profile)
 
     tiles = Tile.query.filter(Tile.id.in_(tile_ids)).order_by(Tile.id.desc()).all()
     if not tiles:
         return "No tiles selected", 400
 
-    # custom pdf file name
-    if pdf_name:
-        safe_name = pdf_name.replace(" ", "_")
-        if not safe_name.lower().endswith(".pdf"):
-            safe_name += ".pdf"
-        pdf_path = safe_name
-    else:
-        pdf_path = "tiles_selected.pdf"
+    return send_catalogue_pdf(tiles, client_name, layout,
+                              pdf_file_name(pdf_name, "tiles_selected.pdf"), profile)
 
-    c = canvas.Canvas(pdf_path, pagesize=A4)
 
-    # cover
-    draw_cover_page(c, client_name)
-    c.showPage()
+# ------------------------------------------------
+# PDF: Multiple tiles as a background job
+#   POST /pdf_jobs                -> {"job_id": ...}
+#   GET  /pdf_jobs/<id>           -> state + pages done / total, then size
+#   GET  /pdf_jobs/<id>/download  -> finished PDF
+# ------------------------------------------------
+def run_pdf_job(job, tile_ids: list[int], client_name: str | None,
+                layout: str = DEFAULT_PDF_LAYOUT, profile: str = DEFAULT_PDF_PROFILE):
+    with app.app_context():
+        tiles = Tile.query.filter(Tile.id.in_(tile_ids)).order_by(Tile.id.desc()).all()
+        if not tiles:
+            raise ValueError("No tiles selected")
+        use_cache = bool(app.config["PDF_CACHE_MAX_BYTES"])
+        key = catalogue_cache_key(tiles, client_name, layout, profile) if use_cache else None
+        company = company_details()
+
+        # hand the connection back while rendering (tiles and company stay loaded)
+        db.session.close()
+
+        result = job.path("result.pdf")
+        cached = catalogue_cache.get(key) if use_cache else None
+        if cached:
+            shutil.copyfile(cached, result)
+            job.update(cached=True, done=len(tiles) + 1, total=len(tiles) + 1)
+        else:
+            job.progress(0, len(tiles) + 1)
+            render_catalogue_pdf(result, tiles, client_name, progress=job.progress,
+                                 layout=layout, profile=profile, company=company)
+            if use_cache:
+                catalogue_cache.store(
+                    key, lambda out: shutil.copyfile(result, out), [t.id for t in tiles]
+                )
+        job.update(result="result.pdf", size=os.path.getsize(result))
+
+
+@app.route("/pdf_jobs", methods=["POST"])
+def submit_pdf_job():
+    tile_ids = parse_tile_ids(request.form.getlist("tile_ids"))
+    client_name = request.form.get("client_name", "").strip() or None
+    pdf_name = request.form.get("pdf_name", "").strip()
+    layout = parse_layout(request.form.get("layout"))
+    profile = parse_profile(request.form.get("profile"))
+
+    if tile_ids is None:
+        return jsonify(error="Invalid tile ids"), 400
+    if not tile_ids:
+        return jsonify(error="No tiles selected"), 400
+    if layout is None:
+        return jsonify(error="Invalid layout"), 400
+    if profile is None:
+        return jsonify(error="Invalid profile"), 400
+
+    job_id = pdf_jobs.submit(
+        run_pdf_job,
+        tile_ids,
+        client_name,
+        layout,
+        profile,
+        kind="pdf",
+        layout=layout,
+        profile=profile,
+        total=len(tile_ids) + 1,
+        filename=pdf_file_name(pdf_name, "tiles_selected.pdf"),
+    )
+    return jsonify(
+        job_id=job_id,
+        status_url=f"/pdf_jobs/{job_id}",
+        download_url=f"/pdf_jobs/{job_id}/download",
+    ), 202
+
+
+@app.route("/pdf_jobs/<job_id>")
+def pdf_job_status(job_id):
+    status = pdf_jobs.status(job_id)
+    if not status:
+        return jsonify(error="Job not found"), 404
+
+    return jsonify(
+        job_id=job_id,
+        state=status["state"],
+        done=status["done"],
+        total=status["total"],
+        error=status["error"],
+        layout=status.get("layout"),
+        profile=status.get("profile"),
+        size=status.get("size"),   # bytes of the finished PDF / ZIP
+        download_url=f"/pdf_jobs/{job_id}/download" if status["state"] == "done" else None,
+    )
+
+
+@app.route("/pdf_jobs/<job_id>/download")
+def pdf_job_download(job_id):
+    status = pdf_jobs.status(job_id)
+    if not status:
+        return "Job not found", 404
+
+    path = pdf_jobs.result_path(job_id)
+    if not path:
+        return f"Job is {status['state']}", 409
 
-    # tiles pages
-    for idx, t in enumerate(tiles):
-        draw_tile_detail_page(c, t)
-        if idx < len(tiles) - 1:
-            c.showPage()
+    return send_file(path, as_attachment=True, download_name=status.get("filename"))
 
-    c.save()
-    return send_file(pdf_path, as_attachment=True)
+
+# ------------------------------------------------
+# PDF: Batch export (one tile selection, a catalogue per client)
+#   POST /pdf_batch -> a PDF job whose result is a ZIP of the catalogues
+#   (command line: cli.py batch)
+# ------------------------------------------------
+def parse_client_names(raw_values) -> list[str]:
+    """Client names from form fields and/or lines of text; blanks and
+    repeats dropped, order kept."""
+    names = []
+    for value in raw_values:
+        for line in (value or "").splitlines():
+            name = line.strip()
+            if name and name not in names:
+                names.append(name)
+    return names
+
+
+def batch_file_names(client_names) -> list[str]:
+    """A distinct, filesystem-safe PDF name per client."""
+    used = set()
+    names = []
+    for i, client in enumerate(client_names, start=1):
+        base = secure_filename(client) or f"client_{i}"
+        name, n = base, 1
+        while name.lower() in used:
+            n += 1
+            name = f"{base}_{n}"
+        used.add(name.lower())
+        names.append(name + ".pdf")
+    return names
+
+
+def render_client_batch(out_dir: str, tiles, client_names, layout: str = DEFAULT_PDF_LAYOUT,
+                        progress=None, workers: int | None = None,
+                        profile: str = DEFAULT_PDF_PROFILE,
+                        company: dict | None = None) -> list[str]:
+    """
+    Write a catalogue per name in `client_names` into `out_dir`; returns
+    their paths in the same order.
+
+    In the detail layout only the cover differs between clients: the tile
+    pages are assembled once into a shared body, the covers are drawn on
+    one canvas (poster embedded once), and each client's file is the body
+    with its cover in front (page_fragments.prepend_page), written on
+    `workers` processes (PDF_BATCH_WORKERS). Grid pages print the client
+    on every page, so those catalogues are drawn one by one, sharing the
+    pre-scaled photos, and print `company` (see render_catalogue_pdf).
+    `progress(done, total)` counts tiles, then clients.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    paths = [os.path.join(out_dir, name) for name in batch_file_names(client_names)]
+    total = len(tiles) + len(paths)
+
+    if PDF_LAYOUTS[layout] > 1:
+        company = company_details() if company is None else company
+        for i, (client, path) in enumerate(zip(client_names, paths)):
+            render_catalogue_pdf(path, tiles, client, layout=layout, profile=profile,
+                                 company=company)
+            if progress:
+                progress(len(tiles) + i + 1, total)
+        return paths
+
+    body = os.path.join(out_dir, f".body_{uuid.uuid4().hex}.pdf")
+    covers = os.path.join(out_dir, f".covers_{uuid.uuid4().hex}.pdf")
+    try:
+        if app.config["PAGE_FRAGMENT_MAX_BYTES"]:
+            assemble_catalogue_pdf(
+                body, tiles, progress=(lambda done, _: progress(done, total)) if progress else None,
+                with_cover=False, profile=profile,
+            )
+        else:
+            prepare_tile_images(tiles, profile=profile)
+            c = canvas.Canvas(body, pagesize=A4)
+            for idx, t in enumerate(tiles):
+                draw_tile_detail_page(c, t, profile)
+                c.showPage()
+                if progress:
+                    progress(idx + 1, total)
+            with metrics.span("pdf_save"):
+                c.save()
+
+        c = canvas.Canvas(covers, pagesize=A4)
+        for client in client_names:
+            draw_cover_page(c, client, profile)
+            c.showPage()
+        with metrics.span("pdf_save"):
+            c.save()
+
+        if workers is None:
+            workers = app.config["PDF_BATCH_WORKERS"] or os.cpu_count() or 1
+        done = len(tiles)
+        with metrics.span("batch_prepend"):
+            if workers <= 1 or len(paths) < BATCH_PARALLEL_MIN_CLIENTS:
+                for i, path in enumerate(paths):
+                    page_fragments.prepend_page(body, covers, i, path)
+                    done += 1
+                    if progress:
+                        progress(done, total)
+            else:
+                # forkserver children are forked from a clean process (we're
+                # usually on a job thread)
+                methods = multiprocessing.get_all_start_methods()
+                ctx = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+                with ProcessPoolExecutor(max_workers=min(workers, len(paths)), mp_context=ctx) as pool:
+                    futures = [
+                        pool.submit(page_fragments.prepend_page, body, covers, i, path)
+                        for i, path in enumerate(paths)
+                    ]
+                    for future in as_completed(futures):
+                        future.result()
+                        done += 1
+                        if progress:
+                            progress(done, total)
+    finally:
+        for path in (body, covers):
+            if os.path.exists(path):
+                os.remove(path)
+    return paths
+
+
+def write_zip(zip_path: str, paths):
+    # PDFs are compressed already; storing them keeps zipping at disk speed
+    with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_STORED) as zf:
+        for path in paths:
+            zf.write(path, os.path.basename(path))
+
+
+def run_batch_job(job, tile_ids: list[int], client_names: list[str],
+                  layout: str = DEFAULT_PDF_LAYOUT, profile: str = DEFAULT_PDF_PROFILE):
+    with app.app_context():
+        tiles = Tile.query.filter(Tile.id.in_(tile_ids)).order_by(Tile.id.desc()).all()
+        if not tiles:
+            raise ValueError("No tiles selected")
+        company = company_details()
+        db.session.close()
+
+        out_dir = job.path("catalogues")
+        job.progress(0, len(tiles) + len(client_names))
+        paths = render_client_batch(out_dir, tiles, client_names, layout, progress=job.progress,
+                                    profile=profile, company=company)
+        write_zip(job.path("result.zip"), paths)
+        shutil.rmtree(out_dir, ignore_errors=True)
+        job.update(result="result.zip", size=os.path.getsize(job.path("result.zip")))
+
+
+@app.route("/pdf_batch", methods=["POST"])
+def submit_pdf_batch():
+    tile_ids = parse_tile_ids(request.form.getlist("tile_ids"))
+    client_names = parse_client_names(request.form.getlist("client_names"))
+    zip_name = secure_filename(request.form.get("zip_name", "").strip())
+    layout = parse_layout(request.form.get("layout"))
+    profile = parse_profile(request.form.get("profile"))
+
+    if tile_ids is None:
+        return jsonify(error="Invalid tile ids"), 400
+    if not tile_ids:
+        return jsonify(error="No tiles selected"), 400
+    if not client_names:
+        return jsonify(error="No client names"), 400
+    if len(client_names) > app.config["PDF_BATCH_MAX_CLIENTS"]:
+        return jsonify(error=f"At most {app.config['PDF_BATCH_MAX_CLIENTS']} clients per batch"), 400
+    if layout is None:
+        return jsonify(error="Invalid layout"), 400
+    if profile is None:
+        return jsonify(error="Invalid profile"), 400
+
+    if zip_name and not zip_name.lower().endswith(".zip"):
+        zip_name += ".zip"
+    job_id = pdf_jobs.submit(
+        run_batch_job,
+        tile_ids,
+        client_names,
+        layout,
+        profile,
+        kind="batch",
+        layout=layout,
+        profile=profile,
+        clients=len(client_names),
+        total=len(tile_ids) + len(client_names),
+        filename=zip_name or "catalogues.zip",
+    )
+    return jsonify(
+        job_id=job_id,
+        status_url=f"/pdf_jobs/{job_id}",
+        download_url=f"/pdf_jobs/{job_id}/download",
+    ), 202
 
 
 # ------------------------------------------------
 # Run
 # ------------------------------------------------
 if __name__ == "__main__":
+    init_app()
     app.run(debug=True)
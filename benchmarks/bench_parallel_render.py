@@ -0,0 +1,91 @@
+# benchmarks/bench_parallel_render.py
+"""
+Serial vs parallel catalogue rendering.
+
+Creates N synthetic phone-sized tile photos, then times render_catalogue_pdf
+using 1 worker and using --workers processes. Every timing runs in its own
+process with a throwaway instance folder (database, image cache, page
+fragments), so each starts cold and the real instance is never touched.
+
+    python benchmarks/bench_parallel_render.py --sizes 10 100 500 --workers 8
+    python benchmarks/bench_parallel_render.py --layout grid3
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from io import BytesIO
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from synthetic import make_photos, make_tiles  # noqa: E402
+
+# app.PDF_LAYOUTS, without importing the app (and opening its database)
+LAYOUTS = ["detail", "grid2", "grid3"]
+
+
+def time_render(photos: list[str], workers: int, layout: str) -> tuple[float, int]:
+    """Runs in the child process started by spawn(); INSTANCE_PATH is
+    already pointing at a throwaway folder."""
+    from app import app, init_app, render_catalogue_pdf
+
+    init_app()
+    buf = BytesIO()
+    with app.app_context():
+        start = time.perf_counter()
+        render_catalogue_pdf(buf, make_tiles(photos), "Benchmark", workers=workers, layout=layout)
+        elapsed = time.perf_counter() - start
+    return elapsed, buf.tell()
+
+
+def spawn(photos: list[str], workers: int, layout: str, work: str) -> tuple[float, int]:
+    instance = tempfile.mkdtemp(prefix="instance_", dir=work)
+    env = dict(os.environ, INSTANCE_PATH=instance)
+    env.pop("DATABASE_URL", None)   # SQLite in the throwaway instance folder
+    spec = {"photos": photos, "workers": workers, "layout": layout}
+    try:
+        proc = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--run", json.dumps(spec)],
+            env=env, cwd=ROOT, capture_output=True, text=True, check=True,
+        )
+    except subprocess.CalledProcessError as e:
+        sys.exit(e.stderr.strip() or f"benchmark run failed (exit {e.returncode})")
+    finally:
+        shutil.rmtree(instance, ignore_errors=True)
+    elapsed, size = json.loads(proc.stdout.strip().splitlines()[-1])
+    return elapsed, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--layout", choices=LAYOUTS, default="detail")
+    parser.add_argument("--run", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        spec = json.loads(args.run)
+        print(json.dumps(time_render(spec["photos"], spec["workers"], spec["layout"])))
+        return
+
+    work = tempfile.mkdtemp(prefix="tile_bench_")
+    try:
+        photos = make_photos(work, max(args.sizes))
+
+        print(f"{'tiles':>6} {'serial s':>10} {f'{args.workers} procs s':>12} {'speedup':>8} {'pdf MB':>8}")
+        for n in args.sizes:
+            serial, size = spawn(photos[:n], 1, args.layout, work)
+            parallel, _ = spawn(photos[:n], args.workers, args.layout, work)
+            print(f"{n:>6} {serial:>10.2f} {parallel:>12.2f} {serial / parallel:>7.1f}x {size / 1e6:>8.1f}")
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
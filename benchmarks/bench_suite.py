@@ -0,0 +1,276 @@
+# benchmarks/bench_suite.py
+"""
+PDF generation and Excel import at several scales.
+
+Cases:
+  generate_pdf           GET /generate_pdf/<id> once per tile (N requests)
+  generate_pdf_multiple  POST /generate_pdf_multiple with N tiles, per --layouts
+                         and --profiles
+  generate_tiles_pdf     pdf_generator.generate_tiles_pdf with N tiles
+  excel_import           import_excel_with_images on a synthetic N-row sheet
+                         (and on the 10-tile sample in uploads/)
+
+Every case runs in a fresh Python process with its own instance folder
+(INSTANCE_PATH: SQLite DB and caches), so peak RSS is per case and the real
+catalogue is never touched. Each case runs twice in that process: `wall_s`
+is the first (cold) run, `repeat_s` the second, which shows what the PDF
+caches / photo reuse save. Results go to a JSON file; --compare prints the
+change against an earlier one.
+
+    python benchmarks/bench_suite.py --scales 10 100 500
+    python benchmarks/bench_suite.py --output bench_results_new.json --compare bench_results.json
+"""
+import argparse
+import glob
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from synthetic import make_photos, make_tiles, make_workbook  # noqa: E402
+
+CASES = ["generate_pdf", "generate_pdf_multiple", "generate_tiles_pdf", "excel_import"]
+SAMPLE_XLSX = os.path.join(ROOT, "uploads", "*_10_tiles_with_photo_column.xlsx")
+
+
+# ------------------------------------------------
+# Measuring (inside the case process)
+# ------------------------------------------------
+def peak_rss_mb(who=resource.RUSAGE_SELF) -> float:
+    """High-water resident set size; ru_maxrss is KiB on Linux, bytes on macOS."""
+    rss = resource.getrusage(who).ru_maxrss
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def timed(fn) -> tuple[float, int]:
+    start = time.perf_counter()
+    size = fn()
+    return round(time.perf_counter() - start, 4), size
+
+
+def run_case(spec: dict) -> dict:
+    """Set up and time one case. Runs in the child process started by
+    main(); INSTANCE_PATH is already pointing at a throwaway folder."""
+    import pdf_generator
+    from app import IMAGES_DIR, ImageBlob, app, db, import_excel_with_images, init_app
+
+    init_app()
+
+    case, n = spec["case"], spec["scale"]
+    photos = sorted(glob.glob(os.path.join(spec["photos"], "*.jpg")))[:n]
+    result = {}
+
+    with app.app_context():
+        if case != "excel_import":
+            tiles = make_tiles(photos)
+            db.session.add_all(tiles)
+            db.session.commit()
+            tiles = [t.to_dict() for t in tiles]
+        client = app.test_client()
+        baseline = peak_rss_mb()
+
+        if case == "generate_pdf":
+            def run():
+                size = 0
+                for t in tiles:
+                    resp = client.get(f"/generate_pdf/{t['id']}?client_name=Benchmark")
+                    assert resp.status_code == 200, resp.status_code
+                    size += len(resp.data)
+                return size
+
+        elif case == "generate_pdf_multiple":
+            def run():
+                resp = client.post("/generate_pdf_multiple", data={
+                    "tile_ids": [t["id"] for t in tiles],
+                    "client_name": "Benchmark",
+                    "layout": spec["layout"],
+                    "profile": spec["profile"],
+                })
+                assert resp.status_code == 200, resp.status_code
+                return len(resp.data)
+
+        elif case == "generate_tiles_pdf":
+            def run():
+                return pdf_generator.generate_tiles_pdf("Benchmark", tiles).getbuffer().nbytes
+
+        else:
+            before = set(os.listdir(IMAGES_DIR))
+            imported = []
+
+            def run():
+                stats = import_excel_with_images(spec["xlsx"])
+                imported.append(stats["imported"])
+                return sum(
+                    os.path.getsize(os.path.join(IMAGES_DIR, name))
+                    for (name,) in db.session.query(ImageBlob.filename)
+                )
+
+        try:
+            result["wall_s"], result["output_bytes"] = timed(run)
+            result["repeat_s"], _ = timed(run)
+        finally:
+            if case == "excel_import":
+                # stored photos land in the real static/images; remove ours
+                for (name,) in db.session.query(ImageBlob.filename):
+                    if name not in before:
+                        try:
+                            os.remove(os.path.join(IMAGES_DIR, name))
+                        except OSError:
+                            pass
+        if case == "excel_import":
+            result["rows_imported"] = imported[0]
+            result["input_bytes"] = os.path.getsize(spec["xlsx"])
+
+    result["baseline_rss_mb"] = baseline
+    result["peak_rss_mb"] = peak_rss_mb()
+    # photo pre-scaling runs in a process pool when PDF_RENDER_WORKERS > 1
+    result["peak_child_rss_mb"] = peak_rss_mb(resource.RUSAGE_CHILDREN)
+    return result
+
+
+# ------------------------------------------------
+# Orchestration
+# ------------------------------------------------
+def case_label(r: dict) -> str:
+    parts = [r["case"]]
+    if r.get("layout"):
+        parts.append(r["layout"])
+    if r.get("profile", "print") != "print":
+        parts.append(r["profile"])
+    if r.get("input") == "sample":
+        parts.append("sample")
+    return "/".join(parts)
+
+
+def spawn(spec: dict, work: str) -> dict:
+    instance = tempfile.mkdtemp(prefix="instance_", dir=work)
+    env = dict(os.environ, INSTANCE_PATH=instance)
+    env.pop("DATABASE_URL", None)   # SQLite in the throwaway instance folder
+    proc = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--run-case", json.dumps(spec)],
+        env=env, cwd=ROOT, capture_output=True, text=True,
+    )
+    shutil.rmtree(instance, ignore_errors=True)
+    if proc.returncode != 0:
+        return {"error": (proc.stderr.strip().splitlines() or ["exit %d" % proc.returncode])[-1]}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def git_revision() -> str | None:
+    try:
+        rev = subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT,
+                             capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"],
+                               cwd=ROOT, capture_output=True, text=True).stdout.strip()
+        return rev + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: list[dict], old_path: str):
+    with open(old_path, encoding="utf-8") as f:
+        old = {(case_label(r), r["scale"]): r for r in json.load(f)["results"]}
+    print(f"\nvs {old_path}")
+    print(f"{'case':<32} {'tiles':>6} {'wall':>8} {'repeat':>8} {'peak RSS':>9}")
+    for r in results:
+        prev = old.get((case_label(r), r["scale"]))
+        if not prev or "error" in r or "error" in prev:
+            continue
+
+        def ratio(field):
+            return f"{r[field] / prev[field]:.2f}x" if prev.get(field) else "-"
+
+        print(f"{case_label(r):<32} {r['scale']:>6} {ratio('wall_s'):>8} "
+              f"{ratio('repeat_s'):>8} {ratio('peak_rss_mb'):>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scales", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--cases", nargs="+", choices=CASES, default=CASES)
+    parser.add_argument("--layouts", nargs="+", default=["detail", "grid2"],
+                        help="layouts for generate_pdf_multiple")
+    parser.add_argument("--profiles", nargs="+", default=["print"],
+                        help="output profiles for generate_pdf_multiple")
+    parser.add_argument("--photo-size", default="2000x1500",
+                        help="synthetic photo size, WxH pixels")
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    parser.add_argument("--run-case", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_case:
+        print(json.dumps(run_case(json.loads(args.run_case))))
+        return
+
+    photo_size = tuple(int(v) for v in args.photo_size.lower().split("x"))
+    work = tempfile.mkdtemp(prefix="tile_bench_")
+    results = []
+    try:
+        photos_dir = os.path.join(work, "photos")
+        os.makedirs(photos_dir)
+        print(f"Creating {max(args.scales)} synthetic photos ({args.photo_size})...")
+        photos = make_photos(photos_dir, max(args.scales), photo_size)
+
+        specs = []
+        for case in args.cases:
+            for n in args.scales:
+                spec = {"case": case, "scale": n, "photos": photos_dir}
+                if case == "generate_pdf_multiple":
+                    specs += [dict(spec, layout=layout, profile=profile)
+                              for layout in args.layouts for profile in args.profiles]
+                elif case == "excel_import":
+                    spec["xlsx"] = make_workbook(os.path.join(work, f"import_{n}.xlsx"), photos[:n])
+                    specs.append(spec)
+                else:
+                    specs.append(spec)
+        sample = sorted(glob.glob(SAMPLE_XLSX))
+        if "excel_import" in args.cases and sample:
+            specs.append({"case": "excel_import", "scale": 10, "input": "sample",
+                          "photos": photos_dir, "xlsx": sample[0]})
+
+        print(f"{'case':<32} {'tiles':>6} {'wall s':>8} {'repeat s':>9} {'peak MB':>8} {'output MB':>10}")
+        for spec in specs:
+            r = {k: v for k, v in spec.items() if k not in ("photos", "xlsx")}
+            r.update(spawn(spec, work))
+            results.append(r)
+            if "error" in r:
+                print(f"{case_label(r):<32} {r['scale']:>6}  failed: {r['error']}")
+            else:
+                print(f"{case_label(r):<32} {r['scale']:>6} {r['wall_s']:>8.2f} {r['repeat_s']:>9.2f} "
+                      f"{r['peak_rss_mb']:>8.0f} {r['output_bytes'] / 1e6:>10.2f}")
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "revision": git_revision(),
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "pdf_render_workers": os.environ.get("PDF_RENDER_WORKERS"),
+            "photo_size": args.photo_size,
+            "scales": args.scales,
+        },
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nWrote {args.output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
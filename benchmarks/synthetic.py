@@ -0,0 +1,73 @@
+# benchmarks/synthetic.py
+"""
+Synthetic catalogue data for the benchmarks: tile photos, unsaved Tile
+objects and Excel sheets in the layout import_excel_with_images reads
+(name, sku, size, price, description, tags, photo in column G).
+
+Only models is imported here, so building the data never starts the app.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from openpyxl import Workbook  # noqa: E402
+from openpyxl.drawing.image import Image as SheetImage  # noqa: E402
+from PIL import Image  # noqa: E402
+
+from models import Tile  # noqa: E402
+
+SIZES = ["600X600", "600X1200", "300X600", "800X1600"]
+FINISHES = ["GLOSSY", "MATT", "CARVING", "SUGAR"]
+SHEET_HEADER = ["name", "sku", "size", "price", "description", "tags", "photo_image"]
+
+
+def make_photos(folder: str, count: int, size=(3000, 2250)) -> list[str]:
+    """Distinct JPEGs roughly the size of a phone photo."""
+    base = Image.effect_mandelbrot(size, (-2.0, -1.2, 1.0, 1.2), 100).convert("RGB")
+    paths = []
+    for i in range(count):
+        # tint each copy so every file hashes differently
+        tint = Image.new("RGB", size, ((i * 37) % 256, (i * 91) % 256, (i * 53) % 256))
+        im = Image.blend(base, tint, 0.3)
+        path = os.path.join(folder, f"photo_{i:04d}.jpg")
+        im.save(path, quality=90)
+        paths.append(path)
+    return paths
+
+
+def make_tiles(paths: list[str]) -> list[Tile]:
+    """Unsaved Tile objects pointing at the synthetic photos."""
+    return [
+        Tile(
+            id=i + 1,
+            name=f"BENCH TILE {i + 1}",
+            size=SIZES[i % len(SIZES)],
+            tags=FINISHES[i % len(FINISHES)],
+            web_path=None,
+            photo_path=p,
+            image_missing=False,
+        )
+        for i, p in enumerate(paths)
+    ]
+
+
+def make_workbook(path: str, photos: list[str]) -> str:
+    """An import sheet with one tile per photo, each picture anchored in
+    column G of its row (as a floating picture, like Excel's Insert Picture)."""
+    wb = Workbook()
+    ws = wb.active
+    ws.append(SHEET_HEADER)
+    ws.column_dimensions["G"].width = 18
+    for row, photo in enumerate(photos, start=2):
+        n = row - 1
+        ws.append([
+            f"BENCH TILE {n}", f"BT-{n:05d}", SIZES[n % len(SIZES)], 90 + n % 60,
+            "Synthetic benchmark tile", FINISHES[n % len(FINISHES)], None,
+        ])
+        ws.row_dimensions[row].height = 60
+        picture = SheetImage(photo)
+        picture.width, picture.height = 110, 80
+        ws.add_image(picture, f"G{row}")
+    wb.save(path)
+    return path
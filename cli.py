@@ -0,0 +1,306 @@
+# cli.py
+"""
+Command-line entry point for work that doesn't need the web server:
+cron jobs, bulk catalogue rebuilds, imports and looking at the rows.
+
+    python cli.py migrate
+    python cli.py rows --limit 20 --finish GLOSSY
+    python cli.py import new_designs.xlsx
+    python cli.py build --tiles 12 15 18 --client "Dealer One" --out dealer_one.pdf
+    python cli.py build --size 600X1200 --finish GLOSSY --layout grid3 --out glossy.pdf
+    python cli.py build --tiles 12 15 --profile email --out dealer_one_email.pdf
+    python cli.py build --all --stream --out everything.pdf
+    python cli.py warm-cache --layouts detail grid2
+    python cli.py batch --tiles 12 15 18 --clients-file dealers.txt --zip dealers.zip
+
+Only the standard library is loaded up front; each command imports what it
+needs. `rows` reads the database directly (no reportlab, PIL or openpyxl,
+no folders or schema changes, so run `migrate` first on an old database);
+the other commands load the app and run app.init_app() first.
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def load_app():
+    import app as web
+    web.init_app()
+    return web
+
+
+def instance_path() -> str:
+    """Flask's instance folder for app.py (INSTANCE_PATH moves it)."""
+    return os.environ.get("INSTANCE_PATH") or os.path.join(ROOT, "instance")
+
+
+# ------------------------------------------------
+# rows
+# ------------------------------------------------
+def cmd_rows(args):
+    import json
+
+    from sqlalchemy import create_engine, inspect, select
+    from sqlalchemy.exc import NoSuchTableError, OperationalError
+    from sqlalchemy.orm import Session
+
+    import database
+    from models import Tile
+
+    url = database.database_url(instance_path())
+    if database.is_sqlite(url) and not os.path.exists(url.split("///", 1)[-1]):
+        sys.exit(f"No database at {url}")
+
+    query = select(Tile)
+    if args.name:
+        name = args.name.upper()
+        query = query.where(Tile.name >= name, Tile.name < name + "\uffff")
+    if args.size:
+        query = query.where(Tile.size == args.size)
+    if args.finish:
+        query = query.where(Tile.tags == args.finish.upper())
+    query = query.order_by(Tile.id.desc()).limit(args.limit)
+
+    engine = create_engine(url)
+    try:
+        # an older database (e.g. one the app hasn't started on since an
+        # upgrade) lacks columns the Tile model selects
+        existing = {c["name"] for c in inspect(engine).get_columns("tile")}
+        missing = [c.name for c in Tile.__table__.columns if c.name not in existing]
+        if missing:
+            sys.exit(f"The database schema is out of date (tile has no {', '.join(missing)});"
+                     f" run `python cli.py migrate` first")
+        with Session(engine) as session:
+            tiles = session.scalars(query).all()
+            for t in tiles:
+                if args.json:
+                    print(json.dumps({**t.to_dict(), "image_missing": t.image_missing},
+                                     default=str))
+                else:
+                    photo = "MISSING" if t.image_missing else (t.photo_path or "-")
+                    print(f"{t.id}\t{t.name or ''}\t{t.size or ''}\t{t.tags or ''}\t{photo}")
+    except NoSuchTableError:
+        sys.exit("No tile table; run `python cli.py migrate` first")
+    except OperationalError as e:
+        sys.exit(f"Can't read tiles: {e.orig}")
+    finally:
+        engine.dispose()
+
+
+# ------------------------------------------------
+# migrate
+# ------------------------------------------------
+def cmd_migrate(args):
+    web = load_app()   # init_app() applies pending migrations
+    with web.app.app_context(), web.db.engine.connect() as conn:
+        version = web.migrations.current_version(conn)
+        print(f"Schema at version {version} ({web.db.engine.url})")
+
+
+# ------------------------------------------------
+# import
+# ------------------------------------------------
+def cmd_import(args):
+    import uuid
+
+    web = load_app()
+    failed = False
+    for path in args.files:
+        path = os.path.abspath(path)
+        if not os.path.isfile(path):
+            sys.exit(f"No such file: {path}")
+        with web.app.app_context():
+            # an ImportJob like a web upload: row results are kept and a
+            # failed import can be resumed from /upload_excel
+            job = web.ImportJob(id=uuid.uuid4().hex, file_path=path,
+                                original_name=os.path.basename(path))
+            web.db.session.add(job)
+            web.db.session.commit()
+            job_id = job.id
+
+        start = time.perf_counter()
+        web.run_import_job(job_id)
+        with web.app.app_context():
+            job = web.db.session.get(web.ImportJob, job_id)
+            print(f"{os.path.basename(path)}: {job.state}, {job.rows_imported} imported,"
+                  f" {job.rows_skipped} skipped, {job.images_extracted} photos"
+                  f" in {time.perf_counter() - start:.1f}s (job {job_id})")
+            if job.state != "done":
+                print(f"  error: {job.error}", file=sys.stderr)
+                failed = True
+    if failed:
+        sys.exit(1)
+
+
+# ------------------------------------------------
+# build / batch
+# ------------------------------------------------
+def add_selection_args(parser):
+    parser.add_argument("--tiles", type=int, nargs="+", help="tile ids")
+    parser.add_argument("--all", action="store_true", help="every tile")
+    parser.add_argument("--q", help="search text (as in the catalogue search box)")
+    parser.add_argument("--size")
+    parser.add_argument("--finish")
+
+
+def select_tiles(web, args) -> list:
+    """Tiles picked by --tiles, or by the filters (newest first, like the UI)."""
+    if args.tiles:
+        return (web.Tile.query.filter(web.Tile.id.in_(args.tiles))
+                .order_by(web.Tile.id.desc()).all())
+    if not (args.all or args.q or args.size or args.finish):
+        sys.exit("Pick tiles with --tiles, --all or a filter (--q/--size/--finish)")
+
+    from werkzeug.datastructures import MultiDict
+
+    tiles, cursor = [], None
+    while True:
+        filters = MultiDict({"q": args.q or "", "size": args.size or "",
+                             "finish": args.finish or "", "limit": web.TILE_PAGE_MAX})
+        if cursor:
+            filters["cursor"] = cursor
+        page, cursor = web.query_tiles(filters)
+        tiles.extend(page)
+        if not cursor:
+            return tiles
+
+
+def cmd_build(args):
+    web = load_app()
+    with web.app.app_context():
+        tiles = select_tiles(web, args)
+        if not tiles:
+            sys.exit("No tiles match")
+        web.db.session.close()
+
+        start = time.perf_counter()
+        if args.stream:
+            with open(args.out, "wb") as f:
+                web.stream_catalogue_pdf(f, tiles, args.client, args.layout, args.profile)
+        else:
+            web.render_catalogue_pdf(args.out, tiles, args.client, workers=args.workers,
+                                     layout=args.layout, profile=args.profile)
+    print(f"{len(tiles)} tile(s) -> {args.out} ({os.path.getsize(args.out) / 1e6:.1f} MB,"
+          f" {args.profile}) in {time.perf_counter() - start:.1f}s")
+
+
+def cmd_batch(args):
+    import tempfile
+
+    web = load_app()
+    raw = list(args.clients)
+    if args.clients_file:
+        with open(args.clients_file, encoding="utf-8") as f:
+            raw.append(f.read())
+    client_names = web.parse_client_names(raw)
+    if not client_names:
+        sys.exit("No client names given (--clients / --clients-file)")
+
+    with web.app.app_context():
+        tiles = select_tiles(web, args)
+        if not tiles:
+            sys.exit("No tiles match")
+        web.db.session.close()
+
+        start = time.perf_counter()
+        if args.zip:
+            with tempfile.TemporaryDirectory() as tmp:
+                paths = web.render_client_batch(tmp, tiles, client_names, args.layout,
+                                                workers=args.workers, profile=args.profile)
+                web.write_zip(args.zip, paths)
+            target = args.zip
+        else:
+            web.render_client_batch(args.out, tiles, client_names, args.layout,
+                                    workers=args.workers, profile=args.profile)
+            target = os.path.join(args.out, "")
+    print(f"{len(client_names)} catalogue(s) of {len(tiles)} tile(s) -> {target}"
+          f" in {time.perf_counter() - start:.1f}s")
+
+
+# ------------------------------------------------
+# warm-cache
+# ------------------------------------------------
+def cmd_warm_cache(args):
+    web = load_app()
+    with web.app.app_context():
+        tiles = web.Tile.query.order_by(web.Tile.id.desc()).all()
+        web.db.session.close()
+
+        for profile in args.profiles:
+            for layout in args.layouts:
+                cols = web.PDF_LAYOUTS[layout]
+                box = web.TILE_IMAGE_BOX if cols == 1 else web.pdf_generator.card_image_box(cols)
+                start = time.perf_counter()
+                built = web.prepare_tile_images(tiles, args.workers, box, profile)
+                print(f"{layout}/{profile}: {built} photo(s) pre-scaled"
+                      f" in {time.perf_counter() - start:.1f}s")
+
+            if ("detail" in args.layouts and args.fragments
+                    and web.app.config["PAGE_FRAGMENT_MAX_BYTES"]):
+                start = time.perf_counter()
+                web.tile_fragment_paths(tiles, profile=profile)
+                print(f"detail/{profile}: {len(tiles)} page fragment(s) ready"
+                      f" in {time.perf_counter() - start:.1f}s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    # app.PDF_LAYOUTS and app's PDF_PROFILES, without importing the app
+    layouts = ["detail", "grid2", "grid3"]
+    profiles = ["screen", "email", "print"]
+
+    p = commands.add_parser("migrate", help="create missing tables and apply pending migrations")
+    p.set_defaults(fn=cmd_migrate)
+
+    p = commands.add_parser("rows", help="list tiles")
+    p.add_argument("--limit", type=int, default=50)
+    p.add_argument("--name", help="name prefix")
+    p.add_argument("--size")
+    p.add_argument("--finish")
+    p.add_argument("--json", action="store_true", help="one JSON object per line")
+    p.set_defaults(fn=cmd_rows)
+
+    p = commands.add_parser("import", help="import Excel sheets (photos in column G)")
+    p.add_argument("files", nargs="+")
+    p.set_defaults(fn=cmd_import)
+
+    p = commands.add_parser("build", help="build one catalogue PDF")
+    add_selection_args(p)
+    p.add_argument("--client", help="client name for the cover")
+    p.add_argument("--layout", choices=layouts, default="detail")
+    p.add_argument("--profile", choices=profiles, default="print", help="output profile")
+    p.add_argument("--workers", type=int, help="processes pre-scaling photos")
+    p.add_argument("--stream", action="store_true",
+                   help="write pages as they are drawn (flat memory for very long catalogues)")
+    p.add_argument("--out", required=True, help="PDF path")
+    p.set_defaults(fn=cmd_build)
+
+    p = commands.add_parser("batch", help="one tile selection, a catalogue per client")
+    add_selection_args(p)
+    p.add_argument("--clients", nargs="*", default=[], help="client names")
+    p.add_argument("--clients-file", help="text file with one client name per line")
+    p.add_argument("--layout", choices=layouts, default="detail")
+    p.add_argument("--profile", choices=profiles, default="print", help="output profile")
+    p.add_argument("--workers", type=int, help="processes writing the PDFs")
+    p.add_argument("--out", default="exports", help="folder for the PDFs")
+    p.add_argument("--zip", help="write one ZIP here instead of a folder of PDFs")
+    p.set_defaults(fn=cmd_batch)
+
+    p = commands.add_parser("warm-cache", help="pre-scale photos and render detail pages ahead of time")
+    p.add_argument("--layouts", nargs="+", choices=layouts, default=layouts)
+    p.add_argument("--profiles", nargs="+", choices=profiles, default=["print"])
+    p.add_argument("--workers", type=int, help="processes pre-scaling photos")
+    p.add_argument("--no-fragments", dest="fragments", action="store_false",
+                   help="skip rendering detail page fragments")
+    p.set_defaults(fn=cmd_warm_cache)
+
+    args = parser.parse_args(argv)
+    args.fn(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+# gunicorn.conf.py
+"""
+gunicorn settings, overridable from the environment:
+  PORT, WEB_CONCURRENCY (worker processes), GUNICORN_THREADS (threads per
+  worker), GUNICORN_TIMEOUT (seconds).
+"""
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", 2))
+# PDF rendering and imports spend most of their time in PIL/reportlab and
+# in I/O, so a few threads per worker keep the UI responsive during a build
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", 4))
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 120))
+graceful_timeout = 30
+accesslog = "-"
+
+# import the app (wsgi.py runs migrations) once in the master, not in
+# every worker at the same time
+preload_app = True
+
+
+def post_fork(server, worker):
+    # connections opened by the master must not be shared with the workers
+    from app import app, db
+    with app.app_context():
+        db.engine.dispose(close=False)
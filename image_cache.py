@@ -0,0 +1,242 @@
+# image_cache.py
+"""
+Pre-scaled derivative cache for tile images drawn into PDFs.
+
+Derivatives are keyed by a hash of the source file's bytes plus the target
+box, so a photo is decoded and scaled once and the resulting print-resolution
+JPEG is reused by every later catalogue.
+"""
+import hashlib
+import logging
+import multiprocessing
+import os
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image, ImageOps
+
+import metrics
+
+log = logging.getLogger(__name__)
+
+DEFAULT_DPI = 200
+DEFAULT_QUALITY = 85
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024  # 512 MB
+
+# below this many missing derivatives a process pool costs more than it saves
+PARALLEL_MIN_IMAGES = 4
+
+# (path, mtime_ns, size) -> sha256, so repeated catalogues don't re-read files
+_hash_memo: dict[tuple, str] = {}
+
+
+def file_sha256(path: str) -> str:
+    """sha256 of a file's contents, memoised on path + mtime + size."""
+    st = os.stat(path)
+    key = (path, st.st_mtime_ns, st.st_size)
+    sha = _hash_memo.get(key)
+    if sha:
+        return sha
+
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    sha = h.hexdigest()
+    _hash_memo[key] = sha
+    return sha
+
+
+def box_pixels(box_w: float, box_h: float, dpi: int) -> tuple[int, int]:
+    """Convert a box in PDF points (1/72 inch) to pixels at `dpi`."""
+    return max(1, round(box_w / 72 * dpi)), max(1, round(box_h / 72 * dpi))
+
+
+def derivative_name(sha: str, px_w: int, px_h: int, quality: int) -> str:
+    return f"{sha}_{px_w}x{px_h}_q{quality}.jpg"
+
+
+def flatten_to_rgb(im: Image.Image) -> Image.Image:
+    """RGB copy of `im`, compositing any transparency onto white."""
+    if im.mode in ("RGBA", "LA", "P"):
+        im = im.convert("RGBA")
+        bg = Image.new("RGB", im.size, (255, 255, 255))
+        bg.paste(im, mask=im.getchannel("A"))
+        return bg
+    if im.mode != "RGB":
+        return im.convert("RGB")
+    return im
+
+
+@metrics.span("image_decode")
+def build_derivative(src_path: str, dest_path: str, px_w: int, px_h: int,
+                     quality: int = DEFAULT_QUALITY):
+    """
+    Decode `src_path`, apply EXIF orientation, fit it inside px_w x px_h
+    (never upscaling) and write an RGB JPEG to `dest_path` atomically.
+    """
+    with Image.open(src_path) as im:
+        # let JPEG decode at reduced scale; use the long side since EXIF
+        # orientation may still swap width and height
+        side = max(px_w, px_h)
+        im.draft("RGB", (side, side))
+        im = flatten_to_rgb(ImageOps.exif_transpose(im))
+        im.thumbnail((px_w, px_h), Image.LANCZOS)
+
+        tmp_path = f"{dest_path}.{uuid.uuid4().hex}.tmp"
+        im.save(tmp_path, format="JPEG", quality=quality, optimize=True)
+    os.replace(tmp_path, dest_path)
+
+
+def get_derivative(cache_dir: str, src_path: str, box_w: float, box_h: float,
+                   dpi: int = DEFAULT_DPI, quality: int = DEFAULT_QUALITY,
+                   max_bytes: int | None = DEFAULT_MAX_BYTES,
+                   sha: str | None = None) -> str | None:
+    """
+    Return the path of a cached JPEG of `src_path` sized for a box of
+    box_w x box_h points, building it on first use. Returns None if the
+    source can't be read or decoded. Pass `sha` when the source's content
+    hash is already known to skip hashing it.
+    """
+    if sha is None:
+        try:
+            sha = file_sha256(src_path)
+        except OSError as e:
+            log.warning("Image cache hash error: %s", e)
+            return None
+
+    px_w, px_h = box_pixels(box_w, box_h, dpi)
+    dest = os.path.join(cache_dir, derivative_name(sha, px_w, px_h, quality))
+
+    if os.path.exists(dest):
+        try:
+            os.utime(dest)  # mark as recently used for LRU pruning
+        except OSError:
+            pass
+        return dest
+
+    os.makedirs(cache_dir, exist_ok=True)
+    try:
+        build_derivative(src_path, dest, px_w, px_h, quality)
+    except Exception as e:
+        log.warning("Image cache build error for %s: %s", src_path, e)
+        return None
+
+    if max_bytes:
+        prune(cache_dir, max_bytes)
+    return dest
+
+
+def prefetch_derivatives(cache_dir: str, src_paths, box_w: float, box_h: float,
+                         dpi: int = DEFAULT_DPI, quality: int = DEFAULT_QUALITY,
+                         max_bytes: int | None = DEFAULT_MAX_BYTES,
+                         workers: int | None = None,
+                         hashes: dict[str, str] | None = None) -> int:
+    """
+    Build every missing derivative for `src_paths` up front, spreading the
+    decode/orient/scale/encode work over a process pool. Drawing afterwards
+    is just cache hits, so page order is untouched.
+    `workers` <= 1 builds serially; `hashes` maps paths to known content
+    hashes. Returns derivatives built.
+    """
+    px_w, px_h = box_pixels(box_w, box_h, dpi)
+
+    missing = {}
+    for src in src_paths:
+        if not src or src in missing:
+            continue
+        try:
+            sha = (hashes or {}).get(src) or file_sha256(src)
+        except OSError:
+            continue
+        dest = os.path.join(cache_dir, derivative_name(sha, px_w, px_h, quality))
+        if not os.path.exists(dest):
+            missing[src] = dest
+
+    if not missing:
+        return 0
+
+    os.makedirs(cache_dir, exist_ok=True)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(missing))
+
+    built = 0
+    if workers <= 1 or len(missing) < PARALLEL_MIN_IMAGES:
+        for src, dest in missing.items():
+            try:
+                build_derivative(src, dest, px_w, px_h, quality)
+                built += 1
+            except Exception as e:
+                log.warning("Image cache build error for %s: %s", src, e)
+    else:
+        # forkserver children are forked from a clean process, which is safe
+        # even when we're called from a threaded web worker
+        methods = multiprocessing.get_all_start_methods()
+        ctx = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+            futures = {
+                src: pool.submit(build_derivative, src, dest, px_w, px_h, quality)
+                for src, dest in missing.items()
+            }
+            for src, fut in futures.items():
+                try:
+                    fut.result()
+                    built += 1
+                except Exception as e:
+                    log.warning("Image cache build error for %s: %s", src, e)
+
+    if max_bytes:
+        prune(cache_dir, max_bytes)
+    return built
+
+
+def evict_hash(cache_dir: str, sha: str) -> int:
+    """Remove every cached derivative whose source hashed to `sha`."""
+    if not os.path.isdir(cache_dir):
+        return 0
+
+    removed = 0
+    prefix = sha + "_"
+    for fname in os.listdir(cache_dir):
+        if fname.startswith(prefix):
+            try:
+                os.remove(os.path.join(cache_dir, fname))
+                removed += 1
+            except OSError:
+                pass
+    return removed
+
+
+def prune(cache_dir: str, max_bytes: int) -> int:
+    """
+    Delete least-recently-used derivatives until the cache fits in
+    `max_bytes`. Returns files removed.
+    """
+    if not os.path.isdir(cache_dir):
+        return 0
+
+    entries = []
+    total = 0
+    for entry in os.scandir(cache_dir):
+        if not entry.is_file() or not entry.name.endswith(".jpg"):
+            continue
+        st = entry.stat()
+        entries.append((st.st_mtime, st.st_size, entry.path))
+        total += st.st_size
+
+    if total <= max_bytes:
+        return 0
+
+    removed = 0
+    entries.sort()
+    for _, size, path in entries:
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+            total -= size
+            removed += 1
+        except OSError:
+            pass
+    return removed
@@ -0,0 +1,85 @@
+# image_store.py
+"""
+Content-addressed storage for tile photos under static/images.
+
+A stored photo is named after the sha256 of the uploaded / imported bytes,
+so the same picture is only normalised and written once however many tiles
+(or monthly re-imports) use it. Pictures are decoded once, EXIF-rotated,
+capped to a sensible resolution and re-encoded as JPEG, which is far smaller
+and faster to write than full-size PNG and is embedded by reportlab without
+re-encoding.
+
+Reference counts live in the ImageBlob table (app.py).
+"""
+import hashlib
+import os
+import re
+import time
+import uuid
+from io import BytesIO
+
+from PIL import Image, ImageOps
+
+from image_cache import flatten_to_rgb
+
+MAX_STORED_PX = 2400      # long side of stored originals
+STORED_QUALITY = 88
+
+STORED_NAME_RE = re.compile(r"^([0-9a-f]{64})\.jpg$")
+STORED_DIR = "static/images"   # where photos live, relative to the app root
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def stored_name(sha: str) -> str:
+    """File name of the stored photo for content hash `sha`."""
+    return f"{sha}.jpg"
+
+
+def canonical_path(path: str | None) -> str | None:
+    """
+    The form photo_path is stored in ("static/images/<file>", relative to the
+    app root) for any path a photo was recorded under: absolute, relative,
+    web path, or a Windows path from another machine.
+    """
+    if not path:
+        return None
+    name = os.path.basename(path.replace("\\", "/"))
+    return f"{STORED_DIR}/{name}" if name else None
+
+
+def hash_from_path(path: str | None) -> str | None:
+    """Content hash encoded in a stored photo's path, or None for legacy files."""
+    if not path:
+        return None
+    m = STORED_NAME_RE.match(os.path.basename(path.replace("\\", "/")))
+    return m.group(1) if m else None
+
+
+def normalise_image(data: bytes, max_px: int = MAX_STORED_PX,
+                    quality: int = STORED_QUALITY) -> bytes:
+    """Decode, orient, cap to max_px on the long side and encode as JPEG."""
+    with Image.open(BytesIO(data)) as im:
+        im.draft("RGB", (max_px, max_px))
+        im = flatten_to_rgb(ImageOps.exif_transpose(im))
+        im.thumbnail((max_px, max_px), Image.LANCZOS)
+        out = BytesIO()
+        im.save(out, format="JPEG", quality=quality, optimize=True)
+    return out.getvalue()
+
+
+def save_normalised(data: bytes, dest_path: str, max_px: int = MAX_STORED_PX,
+                    quality: int = STORED_QUALITY) -> float:
+    """
+    normalise_image() and write the result to dest_path atomically.
+    Returns the seconds spent, for per-stage import timings.
+    """
+    start = time.perf_counter()
+    jpeg = normalise_image(data, max_px, quality)
+    tmp_path = f"{dest_path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(jpeg)
+    os.replace(tmp_path, dest_path)
+    return time.perf_counter() - start
@@ -0,0 +1,208 @@
+# jobs.py
+"""
+Background jobs on a local worker pool, plus periodic maintenance tasks.
+
+Each job gets its own directory under `jobs_dir` holding a status.json and
+whatever files the job produces. Keeping state on disk (instead of in a dict)
+lets any worker process answer status and download requests. Finished jobs
+are deleted once they are older than the TTL.
+"""
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+log = logging.getLogger(__name__)
+
+JOB_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+
+STATUS_FILE = "status.json"
+
+# don't rewrite status.json more often than this while a job reports progress
+PROGRESS_WRITE_INTERVAL = 0.5
+
+
+class Job:
+    """Handle passed to the job function for reporting progress."""
+
+    def __init__(self, queue: "JobQueue", job_id: str, status: dict):
+        self.queue = queue
+        self.id = job_id
+        self.dir = queue.job_dir(job_id)
+        self._status = status
+        self._written_at = 0.0
+
+    def path(self, filename: str) -> str:
+        """Path for a file produced by this job."""
+        return os.path.join(self.dir, filename)
+
+    def update(self, **fields):
+        """Merge `fields` into the job status and persist it."""
+        self._status.update(fields)
+        self._write()
+
+    def progress(self, done: int, total: int | None = None):
+        self._status["done"] = done
+        if total is not None:
+            self._status["total"] = total
+        now = time.monotonic()
+        if now - self._written_at >= PROGRESS_WRITE_INTERVAL:
+            self._write()
+
+    def _write(self):
+        self._written_at = time.monotonic()
+        self.queue._write_status(self.id, self._status)
+
+
+class JobQueue:
+    def __init__(self, jobs_dir: str, workers: int = 2, ttl: int = 3600):
+        self.jobs_dir = jobs_dir
+        self.workers = workers
+        self.ttl = ttl
+        self._executor = None
+        self._lock = threading.Lock()
+
+    # ---------- storage ----------
+    def job_dir(self, job_id: str) -> str:
+        return os.path.join(self.jobs_dir, job_id)
+
+    def _write_status(self, job_id: str, status: dict):
+        path = os.path.join(self.job_dir(job_id), STATUS_FILE)
+        tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(status, f)
+        os.replace(tmp, path)
+
+    def status(self, job_id: str) -> dict | None:
+        if not JOB_ID_RE.match(job_id or ""):
+            return None
+        path = os.path.join(self.job_dir(job_id), STATUS_FILE)
+        try:
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def result_path(self, job_id: str) -> str | None:
+        """Path of the finished job's result file, or None if not ready."""
+        status = self.status(job_id)
+        if not status or status.get("state") != "done":
+            return None
+        result = status.get("result")
+        if not result:
+            return None
+        path = os.path.join(self.job_dir(job_id), os.path.basename(result))
+        return path if os.path.exists(path) else None
+
+    # ---------- running ----------
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="job"
+                )
+            return self._executor
+
+    def submit(self, fn, *args, kind: str = "job", total: int = 0, **meta) -> str:
+        """
+        Queue `fn(job, *args)` and return the new job id. `fn` reports
+        progress via job.progress() and sets job.update(result=filename)
+        for the file it wrote into job.dir.
+        """
+        self.cleanup()
+
+        job_id = uuid.uuid4().hex
+        os.makedirs(self.job_dir(job_id), exist_ok=True)
+        status = {
+            "id": job_id,
+            "kind": kind,
+            "state": "queued",
+            "done": 0,
+            "total": total,
+            "error": None,
+            "result": None,
+            "created": time.time(),
+            "finished": None,
+            **meta,
+        }
+        self._write_status(job_id, status)
+
+        job = Job(self, job_id, status)
+        self._get_executor().submit(self._run, job, fn, args)
+        return job_id
+
+    def _run(self, job: Job, fn, args):
+        job.update(state="running", started=time.time())
+        try:
+            fn(job, *args)
+        except Exception as e:
+            log.exception("Job %s failed", job.id)
+            job.update(state="failed", error=str(e), finished=time.time())
+            return
+        job.update(state="done", finished=time.time())
+
+    # ---------- expiry ----------
+    def cleanup(self) -> int:
+        """Delete jobs older than the TTL. Returns jobs removed."""
+        if not os.path.isdir(self.jobs_dir):
+            return 0
+
+        now = time.time()
+        removed = 0
+        for job_id in os.listdir(self.jobs_dir):
+            if not JOB_ID_RE.match(job_id):
+                continue
+            status = self.status(job_id)
+            if status:
+                ref = status.get("finished") or status.get("created") or 0
+                # unfinished jobs get a longer grace period (crashed worker)
+                limit = self.ttl if status.get("finished") else self.ttl * 4
+            else:
+                try:
+                    ref = os.path.getmtime(self.job_dir(job_id))
+                except OSError:
+                    continue
+                limit = self.ttl
+            if now - ref > limit:
+                shutil.rmtree(self.job_dir(job_id), ignore_errors=True)
+                removed += 1
+        return removed
+
+
+class PeriodicTask:
+    """
+    Runs `fn()` on a daemon thread every `interval` seconds, or sooner when
+    wake() is called. Started lazily on the first start()/wake().
+    """
+
+    def __init__(self, name: str, fn, interval: float):
+        self.name = name
+        self.fn = fn
+        self.interval = interval
+        self._event = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._loop, name=self.name, daemon=True)
+                self._thread.start()
+
+    def wake(self):
+        self.start()
+        self._event.set()
+
+    def _loop(self):
+        while True:
+            self._event.wait(self.interval)
+            self._event.clear()
+            try:
+                self.fn()
+            except Exception:
+                log.exception("Periodic task %s failed", self.name)
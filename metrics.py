@@ -0,0 +1,120 @@
+# metrics.py
+"""
+Timing spans for the PDF and import pipelines, exported as Prometheus
+histograms (see app's /metrics).
+
+    with metrics.span("pdf_save"):
+        c.save()
+
+Every span is observed into tile_span_seconds{span="..."}. While a request
+is being handled (begin_request .. end_request) its spans are also summed
+per name, for the Server-Timing response header. Counts are per process:
+each gunicorn worker reports its own, and spans run in photo pre-scaling
+subprocesses aren't seen at all.
+"""
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+           1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Histogram:
+    """Cumulative-bucket histogram with one label."""
+
+    def __init__(self, name: str, help_text: str, label: str, buckets=BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label = label
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._series = {}   # label value -> [bucket counts..., +Inf count, sum]
+
+    def observe(self, label_value: str, seconds: float):
+        with self._lock:
+            series = self._series.get(label_value)
+            if series is None:
+                series = self._series[label_value] = [0] * (len(self.buckets) + 1) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    series[i] += 1
+            series[-2] += 1
+            series[-1] += seconds
+
+    def render(self) -> list[str]:
+        """Lines in the Prometheus text exposition format."""
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {k: list(v) for k, v in sorted(self._series.items())}
+        for value, counts in series.items():
+            label = f'{self.label}="{_escape(value)}"'
+            for bound, count in zip(self.buckets, counts):
+                lines.append(f'{self.name}_bucket{{{label},le="{bound}"}} {count}')
+            lines.append(f'{self.name}_bucket{{{label},le="+Inf"}} {counts[-2]}')
+            lines.append(f"{self.name}_sum{{{label}}} {counts[-1]:.6f}")
+            lines.append(f"{self.name}_count{{{label}}} {counts[-2]}")
+        return lines
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+SPANS = Histogram(
+    "tile_span_seconds", "Time spent in PDF and import pipeline stages.", "span"
+)
+REQUESTS = Histogram(
+    "tile_http_request_seconds", "Time to handle a request, by endpoint.", "endpoint"
+)
+
+# name -> [total seconds, count] for the request being handled
+_request_spans = contextvars.ContextVar("request_spans", default=None)
+
+
+def observe(name: str, seconds: float):
+    """Record a span timed elsewhere (e.g. a stage that keeps its own totals)."""
+    SPANS.observe(name, seconds)
+    spans = _request_spans.get()
+    if spans is not None:
+        entry = spans.setdefault(name, [0.0, 0])
+        entry[0] += seconds
+        entry[1] += 1
+
+
+@contextmanager
+def span(name: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start)
+
+
+def begin_request():
+    _request_spans.set({})
+
+
+def end_request() -> dict:
+    """Spans of the current request, {name: [seconds, count]}."""
+    spans = _request_spans.get() or {}
+    _request_spans.set(None)
+    return spans
+
+
+def server_timing(spans: dict, total: float | None = None) -> str:
+    """Server-Timing header value; durations in milliseconds."""
+    parts = []
+    for name, (seconds, count) in spans.items():
+        part = f"{name};dur={seconds * 1000:.1f}"
+        if count > 1:
+            part += f';desc="{count}x"'
+        parts.append(part)
+    if total is not None:
+        parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts)
+
+
+def render() -> str:
+    return "\n".join(SPANS.render() + REQUESTS.render()) + "\n"
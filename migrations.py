@@ -0,0 +1,281 @@
+# migrations.py
+"""
+Versioned schema migrations.
+
+db.create_all() only creates missing tables; changes to existing tables
+(new indexes, columns, data fixes) are written here as numbered migrations.
+Applied versions are recorded in the schema_version table, and upgrade()
+runs the pending ones in order, each in its own transaction.
+"""
+import logging
+import os
+import sqlite3
+from datetime import datetime
+
+from sqlalchemy import Numeric, inspect, text
+from sqlalchemy.exc import OperationalError
+
+import image_store
+import search_index
+from models import parse_price
+
+log = logging.getLogger(__name__)
+
+MIGRATIONS = []   # (version, description, fn(conn))
+
+# app.root_path: photo paths are stored relative to it
+APP_ROOT = os.path.dirname(os.path.abspath(__file__))
+# where the old models.py kept its own tiles and company tables
+LEGACY_DATABASE = os.path.join(APP_ROOT, "database.db")
+
+
+def migration(version: int, description: str):
+    def register(fn):
+        MIGRATIONS.append((version, description, fn))
+        MIGRATIONS.sort(key=lambda m: m[0])
+        return fn
+    return register
+
+
+def current_version(conn) -> int:
+    return conn.execute(text("SELECT COALESCE(MAX(version), 0) FROM schema_version")).scalar()
+
+
+def add_column(conn, table: str, column: str, ddl_type: str):
+    """ALTER TABLE ... ADD COLUMN unless the column already exists
+    (tables created by db.create_all() already have it)."""
+    columns = {c["name"] for c in inspect(conn).get_columns(table)}
+    if column not in columns:
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl_type}"))
+
+
+def upgrade(engine) -> list[int]:
+    """Apply pending migrations. Returns the versions applied."""
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS schema_version ("
+            " version INTEGER PRIMARY KEY,"
+            " description VARCHAR(200),"
+            " applied_at TIMESTAMP)"
+        ))
+
+    applied = []
+    for version, description, fn in MIGRATIONS:
+        with engine.begin() as conn:
+            if version <= current_version(conn):
+                continue
+            fn(conn)
+            conn.execute(
+                text("INSERT INTO schema_version (version, description, applied_at)"
+                     " VALUES (:v, :d, :t)"),
+                {"v": version, "d": description, "t": datetime.utcnow()},
+            )
+        log.info("Applied migration %d: %s", version, description)
+        applied.append(version)
+    return applied
+
+
+# ------------------------------------------------
+# Migrations
+# ------------------------------------------------
+@migration(1, "index tile name, size and finish (tags) for catalogue queries")
+def _index_tile_filters(conn):
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_tile_name ON tile (name)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_tile_size ON tile (size)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_tile_tags ON tile (tags)"))
+
+
+@migration(2, "full-text search index over tile name, description and finish")
+def _tile_fts(conn):
+    if conn.dialect.name != "sqlite":
+        return
+    try:
+        with conn.begin_nested():
+            search_index.create(conn)
+    except OperationalError as e:
+        # sqlite built without FTS5: search falls back to name prefix
+        log.warning("Full-text search unavailable: %s", e)
+
+
+@migration(3, "track when stored photos lose their last tile (image sweeper)")
+def _image_blob_released_at(conn):
+    add_column(conn, "image_blob", "released_at", "TIMESTAMP")
+    conn.execute(text(
+        "UPDATE image_blob SET released_at = CURRENT_TIMESTAMP"
+        " WHERE ref_count <= 0 AND released_at IS NULL"
+    ))
+
+
+@migration(4, "canonical tile photo paths and an image_missing flag")
+def _canonical_photo_paths(conn):
+    add_column(conn, "tile", "image_missing", "BOOLEAN NOT NULL DEFAULT FALSE")
+
+    rows = conn.execute(text("SELECT id, photo_path, web_path FROM tile")).fetchall()
+    for tile_id, photo_path, web_path in rows:
+        path = image_store.canonical_path(photo_path or web_path)
+        missing = bool(path) and not os.path.isfile(os.path.join(APP_ROOT, os.path.normpath(path)))
+        conn.execute(
+            text("UPDATE tile SET photo_path = :p, web_path = :w, image_missing = :m"
+                 " WHERE id = :id"),
+            {"p": path, "w": "/" + path if path else None, "m": missing, "id": tile_id},
+        )
+
+    # legacy files queued for the image sweeper are matched against photo_path
+    rows = conn.execute(text("SELECT id, path FROM orphan_file")).fetchall()
+    for orphan_id, path in rows:
+        conn.execute(
+            text("UPDATE orphan_file SET path = :p WHERE id = :id"),
+            {"p": image_store.canonical_path(path), "id": orphan_id},
+        )
+
+
+TILE_COLUMNS = (
+    "id, name, sku, size, description, tags, photo_path, web_path,"
+    " image_missing, created_at"
+)
+
+
+def _rebuild_sqlite_tile(conn):
+    """SQLite can't change a column's type in place: copy `tile` into a
+    table with a NUMERIC price, then restore its indexes and search sync."""
+    conn.execute(text(
+        "CREATE TABLE tile_new ("
+        " id INTEGER NOT NULL PRIMARY KEY,"
+        " name VARCHAR(200), sku VARCHAR(100), size VARCHAR(100),"
+        " price NUMERIC(10, 2), description VARCHAR(500), tags VARCHAR(500),"
+        " photo_path VARCHAR(500), web_path VARCHAR(500),"
+        " image_missing BOOLEAN NOT NULL DEFAULT FALSE, created_at DATETIME)"
+    ))
+    conn.execute(text(
+        f"INSERT INTO tile_new ({TILE_COLUMNS}) SELECT {TILE_COLUMNS} FROM tile"
+    ))
+    conn.execute(text("DROP TABLE tile"))
+    conn.execute(text("ALTER TABLE tile_new RENAME TO tile"))
+    _index_tile_filters(conn)
+    if inspect(conn).has_table("tile_fts"):
+        search_index.create(conn)   # triggers went with the old table
+
+
+def _insert_legacy_tiles(conn, rows):
+    """Add rows of the old models.py `tiles` table (name, sku, size, price,
+    description, tags, photo_path, created_at) to `tile`."""
+    for name, sku, size, price, description, tags, photo_path, created_at in rows:
+        path = image_store.canonical_path(photo_path)
+        missing = bool(path) and not os.path.isfile(os.path.join(APP_ROOT, os.path.normpath(path)))
+        price = parse_price(price)
+        conn.execute(
+            text("INSERT INTO tile (name, sku, size, price, description, tags,"
+                 " photo_path, web_path, image_missing, created_at)"
+                 " VALUES (:name, :sku, :size, :price, :description, :tags,"
+                 " :p, :w, :m, :created_at)"),
+            {"name": name, "sku": sku, "size": size,
+             "price": str(price) if price is not None else None,
+             "description": description, "tags": tags, "p": path,
+             "w": "/" + path if path else None, "m": missing, "created_at": created_at},
+        )
+
+
+@migration(5, "one tile schema: created_at, numeric price, legacy tiles table merged")
+def _unify_tile_schema(conn):
+    # existing rows keep a NULL created_at: when they were added is unknown
+    add_column(conn, "tile", "created_at", "TIMESTAMP")
+
+    # the old models.py kept tiles in a second `tiles` table; fold them in
+    # (when it lived in this database; see migration 6 for its own file)
+    if inspect(conn).has_table("tiles"):
+        _insert_legacy_tiles(conn, conn.execute(text(
+            "SELECT name, sku, size, price, description, tags, photo_path, created_at"
+            " FROM tiles"
+        )).fetchall())
+        conn.execute(text("DROP TABLE tiles"))
+
+    # price was free text; keep what parses as a number
+    price_col = next(c for c in inspect(conn).get_columns("tile") if c["name"] == "price")
+    prices = {
+        tile_id: parse_price(price)
+        for tile_id, price in conn.execute(
+            text("SELECT id, price FROM tile WHERE price IS NOT NULL")
+        )
+    }
+    if not isinstance(price_col["type"], Numeric):
+        if conn.dialect.name == "sqlite":
+            _rebuild_sqlite_tile(conn)
+        else:
+            conn.execute(text("ALTER TABLE tile ALTER COLUMN price TYPE NUMERIC(10, 2) USING NULL"))
+    for tile_id, price in prices.items():
+        conn.execute(
+            text("UPDATE tile SET price = :price WHERE id = :id"),
+            {"price": str(price) if price is not None else None, "id": tile_id},
+        )
+
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_tile_created_at ON tile (created_at)"))
+
+
+def _legacy_database(conn) -> str | None:
+    """
+    The old models.py database to fold in: LEGACY_DATABASE if set (empty to
+    skip), else the root database.db, but only when upgrading the default
+    instance database that replaced it (so throwaway instances used by
+    benchmarks and tests don't each get a copy).
+    """
+    path = os.environ.get("LEGACY_DATABASE")
+    if path is None:
+        target = conn.engine.url.database if conn.dialect.name == "sqlite" else None
+        if not target or os.path.abspath(target) != os.path.join(APP_ROOT, "instance", "database.db"):
+            return None
+        path = LEGACY_DATABASE
+    return path if path and os.path.isfile(path) else None
+
+
+@migration(6, "fold in tiles and company from the old standalone database.db")
+def _fold_legacy_database(conn):
+    path = _legacy_database(conn)
+    if not path:
+        return
+    # read-only: the old file is left as it was
+    legacy = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        tables = {name for (name,) in legacy.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table'"
+        )}
+        if "tiles" in tables:
+            rows = legacy.execute(
+                "SELECT name, sku, size, price, description, tags, photo_path, created_at"
+                " FROM tiles ORDER BY id"
+            ).fetchall()
+            _insert_legacy_tiles(conn, rows)
+            log.info("Folded %d tile(s) in from %s", len(rows), path)
+
+        # catalogues use the first company row; keep one set up here
+        has_company = conn.execute(text("SELECT 1 FROM company LIMIT 1")).first()
+        if "company" in tables and not has_company:
+            for company_name, logo_path, phone, email in legacy.execute(
+                "SELECT company_name, logo_path, phone, email FROM company ORDER BY id"
+            ):
+                conn.execute(
+                    text("INSERT INTO company (company_name, logo_path, phone, email)"
+                         " VALUES (:n, :l, :p, :e)"),
+                    {"n": company_name, "l": logo_path, "p": phone, "e": email},
+                )
+    finally:
+        legacy.close()
+
+
+@migration(7, "uppercase legacy names and finishes; search tile sizes")
+def _search_names_and_sizes(conn):
+    # names and finishes are stored uppercase (name search is a prefix
+    # range on that); rows from before the rule never were
+    rows = conn.execute(text("SELECT id, name, tags FROM tile")).fetchall()
+    for tile_id, name, tags in rows:
+        upper_name = name.upper() if name else name
+        upper_tags = tags.upper() if tags else tags
+        if (upper_name, upper_tags) != (name, tags):
+            conn.execute(
+                text("UPDATE tile SET name = :name, tags = :tags WHERE id = :id"),
+                {"name": upper_name, "tags": upper_tags, "id": tile_id},
+            )
+
+    # the full-text index gains a size column
+    if inspect(conn).has_table("tile_fts"):
+        search_index.drop(conn)
+        search_index.create(conn)
@@ -1,40 +1,142 @@
 # models.py
-import os
-import datetime
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-
-BASE_DIR = os.path.dirname(__file__)
-DB_PATH = os.path.join(BASE_DIR, "database.db")
-engine = create_engine(f"sqlite:///{DB_PATH}", echo=False, connect_args={"check_same_thread": False})
-SessionLocal = sessionmaker(bind=engine)
-
-Base = declarative_base()
-
-class Tile(Base):
-    __tablename__ = "tiles"
-    id = Column(Integer, primary_key=True, index=True)
-    name = Column(String(200), nullable=False)
-    sku = Column(String(100), nullable=True)
-    size = Column(String(100), nullable=True)
-    price = Column(String(50), nullable=True)
-    description = Column(Text, nullable=True)
-    tags = Column(String(250), nullable=True)
-    photo_path = Column(String(500), nullable=True)  # absolute path saved
-    created_at = Column(DateTime, default=datetime.datetime.utcnow)
-
-class Company(Base):
-    __tablename__ = "company"
-    id = Column(Integer, primary_key=True, index=True)
-    company_name = Column(String(200), nullable=True)
-    logo_path = Column(String(500), nullable=True)
-    phone = Column(String(50), nullable=True)
-    email = Column(String(120), nullable=True)
-
-def init_db():
-    Base.metadata.create_all(engine)
-
-if __name__ == "__main__":
-    init_db()
-    print("Database initialized at", DB_PATH)
+"""
+Database models: the one schema shared by the web app, background jobs and
+scripts. db.create_all() creates missing tables; changes to existing tables
+go in migrations.py.
+"""
+import hashlib
+import json
+import re
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from flask_sqlalchemy import SQLAlchemy
+
+db = SQLAlchemy()
+
+PRICE_RE = re.compile(r"\d+(?:\.\d+)?")
+CENTS = Decimal("0.01")
+
+
+def parse_price(value) -> Decimal | None:
+    """Price from a spreadsheet cell or legacy text ("1,250.00", 1250, "Rs 90/-")."""
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float, Decimal)):
+        text = str(value)
+    else:
+        m = PRICE_RE.search(str(value).replace(",", ""))
+        if not m:
+            return None
+        text = m.group()
+    try:
+        return Decimal(text).quantize(CENTS)
+    except InvalidOperation:
+        return None
+
+
+# ------------------------------------------------
+# Tiles
+# NOTE: 'tags' column is now used as FINISH (e.g. GLOSSY, MATT)
+# ------------------------------------------------
+class Tile(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(200), index=True)
+    sku = db.Column(db.String(100))      # kept in DB but not used in UI
+    size = db.Column(db.String(100), index=True)
+    price = db.Column(db.Numeric(10, 2))  # kept in DB but not used in UI
+    description = db.Column(db.String(500))
+    tags = db.Column(db.String(500), index=True)     # used as FINISH
+    photo_path = db.Column(db.String(500))   # "static/images/<file>", see set_tile_image
+    web_path = db.Column(db.String(500))
+    image_missing = db.Column(db.Boolean, default=False, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+    def to_dict(self) -> dict:
+        """Plain dict of the tile (the shape pdf_generator and the API use)."""
+        return {
+            "id": self.id,
+            "name": self.name,
+            "sku": self.sku,
+            "size": self.size,
+            "price": self.price,
+            "description": self.description,
+            "tags": self.tags,
+            "photo_path": None if self.image_missing else self.photo_path,
+            "web_path": self.web_path,
+            "created_at": self.created_at,
+        }
+
+    def version(self) -> str:
+        """Changes whenever anything shown for the tile changes."""
+        raw = json.dumps(self.to_dict(), sort_keys=True, default=str).encode("utf-8")
+        return hashlib.sha1(raw).hexdigest()[:16]
+
+
+class Company(db.Model):
+    """Seller details for catalogue headers and footers."""
+    id = db.Column(db.Integer, primary_key=True)
+    company_name = db.Column(db.String(200))
+    logo_path = db.Column(db.String(500))
+    phone = db.Column(db.String(50))
+    email = db.Column(db.String(120))
+
+    def to_dict(self) -> dict:
+        return {
+            "company_name": self.company_name,
+            "logo_path": self.logo_path,
+            "phone": self.phone,
+            "email": self.email,
+        }
+
+
+# ------------------------------------------------
+# Stored photos
+# ------------------------------------------------
+class ImageBlob(db.Model):
+    """
+    A stored photo in static/images, named by the sha256 of its source bytes
+    (see image_store.py). ref_count = number of tiles using it.
+    """
+    sha256 = db.Column(db.String(64), primary_key=True)
+    filename = db.Column(db.String(100))
+    ref_count = db.Column(db.Integer, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # when ref_count last dropped to 0 (or the unused photo was last reused)
+    released_at = db.Column(db.DateTime)
+
+
+class OrphanFile(db.Model):
+    """A legacy (not content-addressed) photo file waiting for the sweeper."""
+    id = db.Column(db.Integer, primary_key=True)
+    path = db.Column(db.String(500))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+# ------------------------------------------------
+# Excel imports
+# ------------------------------------------------
+class ImportJob(db.Model):
+    """One uploaded Excel file being imported in the background."""
+    id = db.Column(db.String(32), primary_key=True)
+    file_path = db.Column(db.String(500))
+    original_name = db.Column(db.String(255))
+    state = db.Column(db.String(20), default="queued")   # queued/running/done/failed
+    rows_processed = db.Column(db.Integer, default=0)
+    rows_imported = db.Column(db.Integer, default=0)
+    rows_skipped = db.Column(db.Integer, default=0)
+    images_extracted = db.Column(db.Integer, default=0)
+    last_committed_row = db.Column(db.Integer, default=1)   # 1 = header row
+    error = db.Column(db.String(1000))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class ImportRow(db.Model):
+    """Result for one sheet row of an ImportJob."""
+    id = db.Column(db.Integer, primary_key=True)
+    job_id = db.Column(db.String(32), db.ForeignKey("import_job.id"), index=True)
+    row_number = db.Column(db.Integer)
+    status = db.Column(db.String(20))   # imported / skipped
+    tile_id = db.Column(db.Integer)
+    message = db.Column(db.String(500))
@@ -0,0 +1,166 @@
+# page_fragments.py
+"""
+Put a catalogue together from pre-rendered single-page PDFs ("fragments").
+
+A tile's detail page is the same in every catalogue, so it is rendered once
+and stored. A catalogue is then a fresh cover page plus the stored
+fragments, appended with pypdf. No page is drawn again. Catalogues that
+differ only in their cover (batch exports) share one assembled body, and
+prepend_page() puts each cover in front of it.
+
+The page template would otherwise be embedded once per fragment. Fragments
+are therefore rendered with an empty stand-in for the template form (see
+TemplateAsset.draw_placeholder). assemble() embeds the real form once, from
+a carrier page, and points every fragment at it. Photos shared by several
+tiles are in each of their fragments; identical objects are merged before
+the catalogue is written.
+"""
+import os
+import re
+import shutil
+from io import BytesIO
+
+from pypdf import PdfReader, PdfWriter
+from pypdf.generic import (
+    ArrayObject, DictionaryObject, IndirectObject, NameObject, NumberObject,
+)
+from reportlab.pdfbase.pdfdoc import xObjectName
+
+STARTXREF_RE = re.compile(rb"startxref\s+(\d+)")
+
+
+def _form_key(form_name: str) -> NameObject:
+    """Resource name reportlab gives the form `form_name`."""
+    return NameObject("/" + xObjectName(form_name))
+
+
+def assemble(out, cover, fragment_paths, carrier=None, form_names=(), progress=None):
+    """
+    Write `cover` (a PDF file or file-like; None for no cover) followed by
+    every fragment to `out`. `carrier` is a PDF whose first page uses the forms in
+    `form_names`; those forms replace the placeholders in the fragments.
+    `progress(done, total)` is called after each fragment.
+    """
+    writer = PdfWriter()
+    if cover is not None:
+        writer.append(cover)
+
+    shared = {}
+    if carrier is not None:
+        n = len(writer.pages)
+        writer.append(carrier, pages=[0])
+        xobjects = writer.pages[n]["/Resources"].get("/XObject") or {}
+        for name in form_names:
+            key = _form_key(name)
+            if key in xobjects:
+                shared[key] = xobjects.raw_get(key)
+        # the carrier page itself isn't part of the document
+        del writer.pages[n]
+
+    for i, path in enumerate(fragment_paths):
+        writer.append(path)
+        xobjects = writer.pages[-1]["/Resources"].get("/XObject")
+        if xobjects is not None:
+            for key, ref in shared.items():
+                if key in xobjects:
+                    xobjects[key] = ref
+        if progress:
+            progress(i + 1, len(fragment_paths))
+
+    # tiles sharing a photo would otherwise embed it once per fragment; this
+    # also drops the placeholder forms nothing points at any more
+    writer.compress_identical_objects(remove_identicals=True, remove_orphans=True)
+    writer.write(out)
+
+
+
+def _startxref(path: str) -> int:
+    """Offset of the last cross-reference section of a PDF."""
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        f.seek(max(0, f.tell() - 1024))
+        return int(STARTXREF_RE.findall(f.read())[-1])
+
+
+def prepend_page(body_path: str, pages_path: str, index: int, out_path: str):
+    """
+    Write `body_path` with page `index` of `pages_path` in front to
+    `out_path`, as an incremental update: the body's bytes are copied as
+    they are, followed by the page's objects (numbered after the body's),
+    the page tree root with the page added and a cross-reference section
+    for just those. Nothing in the body is parsed beyond its trailer and
+    page tree root, so the cost barely depends on the size of the body.
+    """
+    body = PdfReader(body_path)
+    trailer = body.trailer
+    pages_ref = trailer["/Root"].raw_get("/Pages")
+    pages = pages_ref.get_object()
+    first = int(trailer["/Size"])
+
+    page = PdfReader(pages_path).pages[index]
+    del page["/Parent"]   # becomes the body's page tree root, below
+    # source object number -> new number; objects in the order numbered
+    numbers = {page.indirect_reference.idnum: first}
+    objects = [page]
+
+    def renumber(obj):
+        if isinstance(obj, IndirectObject):
+            if obj.idnum not in numbers:
+                numbers[obj.idnum] = first + len(objects)
+                objects.append(obj.get_object())
+            return IndirectObject(numbers[obj.idnum], 0, None)
+        if isinstance(obj, DictionaryObject):
+            for key in list(obj.keys()):
+                obj[key] = renumber(obj.raw_get(key))
+        elif isinstance(obj, ArrayObject):
+            for i, value in enumerate(obj):
+                obj[i] = renumber(value)
+        return obj
+
+    i = 0
+    while i < len(objects):   # renumbering references appends new objects
+        renumber(objects[i])
+        i += 1
+    page[NameObject("/Parent")] = IndirectObject(pages_ref.idnum, pages_ref.generation, None)
+
+    pages[NameObject("/Kids")] = ArrayObject(
+        [IndirectObject(first, 0, None)] + list(pages["/Kids"])
+    )
+    pages[NameObject("/Count")] = NumberObject(int(pages["/Count"]) + 1)
+
+    base = os.path.getsize(body_path)
+    update = BytesIO()
+    update.write(b"\n")
+    offsets = []
+
+    def write_object(number: int, generation: int, obj):
+        offsets.append(base + update.tell())
+        update.write(f"{number} {generation} obj\n".encode())
+        obj.write_to_stream(update)
+        update.write(b"\nendobj\n")
+
+    for n, obj in enumerate(objects, start=first):
+        write_object(n, 0, obj)
+    write_object(pages_ref.idnum, pages_ref.generation, pages)
+
+    xref_at = base + update.tell()
+    update.write(b"xref\n0 1\n0000000000 65535 f \n")
+    update.write(f"{pages_ref.idnum} 1\n{offsets[-1]:010d} {pages_ref.generation:05d} n \n".encode())
+    update.write(f"{first} {len(objects)}\n".encode())
+    update.write(b"".join(f"{o:010d} 00000 n \n".encode() for o in offsets[:-1]))
+
+    new_trailer = DictionaryObject({
+        NameObject("/Size"): NumberObject(first + len(objects)),
+        NameObject("/Root"): trailer.raw_get("/Root"),
+        NameObject("/Prev"): NumberObject(_startxref(body_path)),
+    })
+    for key in ("/Info", "/ID"):
+        if key in trailer:
+            new_trailer[NameObject(key)] = trailer.raw_get(key)
+    update.write(b"trailer\n")
+    new_trailer.write_to_stream(update)
+    update.write(f"\nstartxref\n{xref_at}\n%%EOF\n".encode())
+
+    shutil.copyfile(body_path, out_path)
+    with open(out_path, "ab") as f:
+        f.write(update.getvalue())
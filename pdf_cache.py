@@ -0,0 +1,196 @@
+# pdf_cache.py
+"""
+Cache of whole rendered catalogue PDFs.
+
+Entries are named by a key derived from everything that goes into the
+document (tile ids and versions, client name, layout, asset versions), so
+a changed input simply misses. Each <key>.pdf has a <key>.json listing its
+tile ids, and index/<tile id>/<key> marks every document a tile appears
+in, so deleting a tile drops those documents without reading the others.
+Least recently used entries are evicted past the size and count limits.
+"""
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+DEFAULT_MAX_ENTRIES = 500
+
+INDEX_DIR = "index"
+# eviction goes down to this share of the limits, so a full cache isn't
+# rescanned on every store
+PRUNE_TO = 0.9
+# entries written by other processes aren't in our running totals; rescan
+# the directory at least this often (seconds)
+RESCAN_INTERVAL = 300
+
+
+def make_key(parts: dict) -> str:
+    """Stable cache key for a dict of render inputs."""
+    raw = json.dumps(parts, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(raw).hexdigest()
+
+
+class PdfCache:
+    def __init__(self, directory: str, max_bytes: int = DEFAULT_MAX_BYTES,
+                 max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # running totals since the last directory scan (see prune)
+        self._bytes = 0
+        self._entries = 0
+        self._scanned_at = None
+
+    def _path(self, key: str, ext: str = ".pdf") -> str:
+        return os.path.join(self.directory, key + ext)
+
+    def _index_dir(self, tile_id) -> str:
+        return os.path.join(self.directory, INDEX_DIR, str(tile_id))
+
+    def get(self, key: str) -> str | None:
+        """Path of the cached PDF for `key`, or None."""
+        path = self._path(key)
+        try:
+            os.utime(path)  # mark as recently used for LRU eviction
+        except OSError:
+            return None
+        return path
+
+    def store(self, key: str, render, tile_ids) -> str:
+        """
+        Render a document with `render(out_path)` into the cache and return
+        its path. Written to a temp file first, so readers never see a
+        partial PDF.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        tile_ids = sorted(set(tile_ids))
+        tmp_path = self._path(key, f".{uuid.uuid4().hex}.tmp")
+        try:
+            render(tmp_path)
+            with open(self._path(key, ".json"), "w", encoding="utf-8") as f:
+                json.dump({"tile_ids": tile_ids, "created": time.time()}, f)
+            for tile_id in tile_ids:
+                index_dir = self._index_dir(tile_id)
+                os.makedirs(index_dir, exist_ok=True)
+                open(os.path.join(index_dir, key), "w").close()
+            size = os.path.getsize(tmp_path)
+            os.replace(tmp_path, self._path(key))
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        with self._lock:
+            self._bytes += size
+            self._entries += 1
+            due = (
+                self._scanned_at is None
+                or self._bytes > self.max_bytes
+                or self._entries > self.max_entries
+                or time.monotonic() - self._scanned_at > RESCAN_INTERVAL
+            )
+        if due:
+            self.prune()
+        return self._path(key)
+
+    def _remove(self, key: str) -> int:
+        """Delete an entry and its index marks; returns the PDF's size."""
+        try:
+            with open(self._path(key, ".json"), encoding="utf-8") as f:
+                tile_ids = json.load(f).get("tile_ids", [])
+        except (OSError, ValueError):
+            tile_ids = []
+        for tile_id in tile_ids:
+            try:
+                os.remove(os.path.join(self._index_dir(tile_id), key))
+            except OSError:
+                pass
+
+        size = 0
+        for ext in (".pdf", ".json"):
+            try:
+                if ext == ".pdf":
+                    size = os.path.getsize(self._path(key))
+                os.remove(self._path(key, ext))
+            except OSError:
+                pass
+        return size
+
+    def invalidate_tiles(self, tile_ids) -> int:
+        """Drop every cached document containing one of `tile_ids`."""
+        if not os.path.isdir(self.directory):
+            return 0
+        removed = 0
+        with self._lock:
+            for tile_id in set(tile_ids):
+                index_dir = self._index_dir(tile_id)
+                try:
+                    keys = os.listdir(index_dir)
+                except OSError:
+                    continue
+                for key in keys:
+                    if os.path.exists(self._path(key)):
+                        self._bytes -= self._remove(key)
+                        self._entries -= 1
+                        removed += 1
+                    else:
+                        try:
+                            os.remove(os.path.join(index_dir, key))
+                        except OSError:
+                            pass
+                try:
+                    os.rmdir(index_dir)
+                except OSError:
+                    pass   # re-added meanwhile
+        return removed
+
+    def clear(self) -> int:
+        if not os.path.isdir(self.directory):
+            return 0
+        keys = {n.split(".", 1)[0] for n in os.listdir(self.directory) if n != INDEX_DIR}
+        with self._lock:
+            for key in keys:
+                self._remove(key)
+            shutil.rmtree(os.path.join(self.directory, INDEX_DIR), ignore_errors=True)
+            self._bytes = self._entries = 0
+        return len(keys)
+
+    def prune(self) -> int:
+        """
+        Evict least recently used documents until the cache is back under
+        PRUNE_TO of its limits (if it is over them), and reset the running
+        totals from a scan of the directory.
+        """
+        with self._lock:
+            entries = []
+            total = 0
+            for entry in os.scandir(self.directory):
+                if not entry.name.endswith(".pdf"):
+                    continue
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, entry.name[:-4]))
+                total += st.st_size
+
+            removed = 0
+            if total > self.max_bytes or len(entries) > self.max_entries:
+                entries.sort()
+                max_bytes = self.max_bytes * PRUNE_TO
+                max_entries = int(self.max_entries * PRUNE_TO)
+                while entries and (total > max_bytes or len(entries) > max_entries):
+                    _, size, key = entries.pop(0)
+                    self._remove(key)
+                    total -= size
+                    removed += 1
+
+            self._bytes = total
+            self._entries = len(entries)
+            self._scanned_at = time.monotonic()
+            return removed
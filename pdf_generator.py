@@ -2,30 +2,75 @@
 from reportlab.lib.pagesizes import A4
 from reportlab.pdfgen import canvas
 from reportlab.lib.units import mm
-from PIL import Image
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfbase.pdfmetrics import stringWidth
 import io, datetime, os
 
 PAGE_WIDTH, PAGE_HEIGHT = A4
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
-def generate_tiles_pdf(client_name, tiles, company_info=None):
+MARGIN_X = 15 * mm
+MARGIN_Y = 20 * mm
+GAP_X = 8 * mm
+GAP_Y = 8 * mm
+# card height per number of columns (smaller cards in denser grids)
+CARD_HEIGHTS = {2: 70 * mm, 3: 54 * mm}
+HEADER_H = 35 * mm  # top of the page taken by the header
+IMAGE_SHARE = 0.58   # part of the card height used by the photo
+
+def _as_dict(obj):
+    """Model objects (Tile, Company) are accepted as well as plain dicts."""
+    return obj.to_dict() if hasattr(obj, "to_dict") else obj
+
+def _file_path(path):
+    """Stored paths are relative to the project root."""
+    return os.path.join(BASE_DIR, os.path.normpath(path)) if path else None
+
+def _fit(text, font, size, width):
+    """Cut `text` so it fits in `width` points."""
+    text = text or ""
+    if stringWidth(text, font, size) <= width:
+        return text
+    while text and stringWidth(text + "...", font, size) > width:
+        text = text[:-1]
+    return text + "..."
+
+def card_size(cols):
+    usable_w = PAGE_WIDTH - 2 * MARGIN_X
+    card_w = (usable_w - (cols - 1) * GAP_X) / cols
+    return card_w, CARD_HEIGHTS.get(cols, CARD_HEIGHTS[2])
+
+def card_image_box(cols):
+    """(width, height) in points of the photo area on a card; pre-scale
+    photos to this box so cards embed small JPEGs."""
+    card_w, card_h = card_size(cols)
+    return card_w - 8 * mm, card_h * IMAGE_SHARE
+
+def draw_tiles_grid(c, client_name, tiles, company_info=None, cols=2,
+                    image_path=None, progress=None):
     """
-    tiles: list of dicts {name, sku, size, price, description, photo_path}
-    company_info: dict {company_name, logo_path, phone, email}
-    returns: BytesIO buffer with PDF
+    Draw tiles as cards, `cols` per row, starting on the current page of
+    canvas `c` (pages get header, footer and page numbers).
+    tiles: Tile objects or dicts {name, sku, size, price, description, tags, photo_path}
+    company_info: Company or dict {company_name, logo_path, phone, email}
+    image_path(tile_dict): optional; path of a pre-scaled JPEG for the card,
+        drawn as-is (the original photo is used otherwise)
+    progress(done, total): optional; called after each card
     """
-    buf = io.BytesIO()
-    c = canvas.Canvas(buf, pagesize=A4)
-    margin_x = 15 * mm
-    margin_y = 20 * mm
+    company_info = _as_dict(company_info) if company_info else None
+    card_w, card_h = card_size(cols)
+    img_w, img_h = card_image_box(cols)
+    text_w = card_w - 8 * mm
+    page_num = 1
 
     def draw_header():
         # Logo left
         if company_info and company_info.get("logo_path"):
-            logo_path = company_info.get("logo_path")
+            logo_path = _file_path(company_info.get("logo_path"))
             if logo_path and os.path.exists(logo_path):
                 try:
                     max_h = 18 * mm
-                    c.drawImage(logo_path, margin_x, PAGE_HEIGHT - 30*mm, height=max_h, preserveAspectRatio=True)
+                    c.drawImage(logo_path, MARGIN_X, PAGE_HEIGHT - 30*mm, height=max_h, preserveAspectRatio=True)
                 except Exception:
                     pass
         # Title center
@@ -34,84 +79,90 @@ def generate_tiles_pdf(client_name, tiles, company_info=None):
         # Client name/Date top-right
         c.setFont("Helvetica", 9)
         date_str = datetime.date.today().strftime("%d %b %Y")
-        c.drawRightString(PAGE_WIDTH - margin_x, PAGE_HEIGHT - 15*mm, f"Client: {client_name}")
-        c.drawRightString(PAGE_WIDTH - margin_x, PAGE_HEIGHT - 20*mm, f"Date: {date_str}")
+        c.drawRightString(PAGE_WIDTH - MARGIN_X, PAGE_HEIGHT - 15*mm, f"Client: {client_name or ''}")
+        c.drawRightString(PAGE_WIDTH - MARGIN_X, PAGE_HEIGHT - 20*mm, f"Date: {date_str}")
 
     def draw_footer(page_num):
         footer = ""
         if company_info:
-            footer = f"{company_info.get('company_name','')}  |  {company_info.get('phone','')}  |  {company_info.get('email','')}"
+            footer = f"{company_info.get('company_name') or ''}  |  {company_info.get('phone') or ''}  |  {company_info.get('email') or ''}"
         c.setFont("Helvetica", 8)
         c.drawCentredString(PAGE_WIDTH/2, 12*mm, footer)
-        c.drawRightString(PAGE_WIDTH - margin_x, 12*mm, f"Page {page_num}")
+        c.drawRightString(PAGE_WIDTH - MARGIN_X, 12*mm, f"Page {page_num}")
 
-    # grid: 2 columns
-    cols = 2
-    gap_x = 8 * mm
-    usable_w = PAGE_WIDTH - 2 * margin_x
-    card_w = (usable_w - (cols - 1) * gap_x) / cols
-    card_h = 70 * mm
-
-    x_start = margin_x
-    y = PAGE_HEIGHT - margin_y - 30*mm
-    page_num = 1
+    y_top = PAGE_HEIGHT - HEADER_H
+    y = y_top
     draw_header()
 
     col = 0
-    x = x_start
+    x = MARGIN_X
     for idx, t in enumerate(tiles):
+        t = _as_dict(t)
         # new page if not enough space
-        if y - card_h < margin_y + 30*mm:
+        if y - card_h < MARGIN_Y:
             draw_footer(page_num)
             c.showPage()
             page_num += 1
-            y = PAGE_HEIGHT - margin_y - 30*mm
+            y = y_top
             draw_header()
-            x = x_start
+            x = MARGIN_X
             col = 0
 
-        # Draw card area
-        # c.rect(x, y - card_h, card_w, card_h, stroke=0)  # optional border
-
         # Image area
-        img_h = card_h * 0.58
-        img_w = card_w - 8 * mm
         img_x = x + 4 * mm
         img_y = y - 4 * mm
 
-        if t.get("photo_path") and os.path.exists(t["photo_path"]):
-            try:
-                # open and resize image to fit (preserve aspect)
-                img = Image.open(t["photo_path"])
-                img.thumbnail((int(img_w), int(img_h)))
-                tmp = io.BytesIO()
-                img.save(tmp, format="PNG")
-                tmp.seek(0)
-                c.drawImage(tmp, img_x, img_y - img_h + 4*mm, width=img_w, height=img_h, preserveAspectRatio=True, anchor='nw')
-            except Exception:
-                pass
+        # an unreadable photo leaves its card without an image
+        try:
+            src = image_path(t) if image_path else None
+            if not src:
+                photo_path = _file_path(t.get("photo_path"))
+                if photo_path and os.path.exists(photo_path):
+                    src = ImageReader(photo_path)
+            if src:
+                c.drawImage(src, img_x, img_y - img_h, width=img_w, height=img_h, preserveAspectRatio=True, anchor='c')
+        except Exception:
+            pass
 
         # Text below image
-        text_x = x + 6 * mm
-        text_y = y - img_h - 6 * mm
+        text_x = x + 4 * mm
+        text_y = img_y - img_h - 5 * mm
         c.setFont("Helvetica-Bold", 10)
-        c.drawString(text_x, text_y, (t.get("name") or "")[:40])
+        c.drawString(text_x, text_y, _fit(t.get("name"), "Helvetica-Bold", 10, text_w))
         c.setFont("Helvetica", 8)
-        c.drawString(text_x, text_y - 12, f"SKU: {t.get('sku','')}  |  Size: {t.get('size','')}")
-        c.drawString(text_x, text_y - 24, f"Price: {t.get('price','')}")
+        details = f"Size: {t.get('size') or ''}  |  Finish: {t.get('tags') or ''}"
+        c.drawString(text_x, text_y - 12, _fit(details, "Helvetica", 8, text_w))
+        extras = []
+        if t.get("sku"):
+            extras.append(f"SKU: {t['sku']}")
+        if t.get("price") is not None:
+            extras.append(f"Price: {t['price']}")
+        if extras:
+            c.drawString(text_x, text_y - 24, _fit("  |  ".join(extras), "Helvetica", 8, text_w))
         c.setFont("Helvetica-Oblique", 7)
-        desc = (t.get('description') or "")[:120]
-        c.drawString(text_x, text_y - 36, desc)
+        c.drawString(text_x, text_y - 36, _fit(t.get("description"), "Helvetica-Oblique", 7, text_w))
 
         col += 1
         if col >= cols:
             col = 0
-            x = x_start
-            y -= card_h + 8 * mm
+            x = MARGIN_X
+            y -= card_h + GAP_Y
         else:
-            x += card_w + gap_x
+            x += card_w + GAP_X
+
+        if progress:
+            progress(idx + 1, len(tiles))
 
     draw_footer(page_num)
+
+def generate_tiles_pdf(client_name, tiles, company_info=None, cols=2, image_path=None):
+    """
+    Standalone grid catalogue (see draw_tiles_grid for the arguments).
+    returns: BytesIO buffer with PDF
+    """
+    buf = io.BytesIO()
+    c = canvas.Canvas(buf, pagesize=A4)
+    draw_tiles_grid(c, client_name, tiles, company_info, cols=cols, image_path=image_path)
     c.save()
     buf.seek(0)
     return buf
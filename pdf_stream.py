@@ -0,0 +1,349 @@
+# pdf_stream.py
+"""
+PDF writer that puts each page out as soon as it is finished.
+
+reportlab's Canvas keeps every page (and every image) in memory until
+save(). StreamCanvas implements the part of the Canvas API the catalogue
+pages use: text in the standard fonts, filled rectangles, images and
+form XObjects. Each call to showPage() writes that page's objects to `out`
+and then forgets them. Only object offsets are kept (a few bytes per object),
+plus the ids of images and forms so repeats are referenced, not
+re-embedded.
+
+JPEGs go into the file as they are (DCTDecode), never decoded. Other images
+are decoded once and stored Flate compressed.
+
+iter_chunks() runs a render function on a thread and yields what it writes,
+so a response can start while later pages are still being drawn.
+"""
+import queue
+import threading
+import time
+import zlib
+
+from PIL import Image
+from reportlab.lib.boxstuff import aspectRatioFix
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.pdfbase.pdfutils import readJPEGInfo
+
+from image_cache import flatten_to_rgb
+
+CATALOG_ID = 1
+PAGES_ID = 2
+
+DEFAULT_CHUNK_BYTES = 64 * 1024
+# chunks waiting for the client before the render thread blocks
+DEFAULT_MAX_PENDING = 16
+
+
+def _num(value: float) -> str:
+    return f"{value:.2f}".rstrip("0").rstrip(".") if value % 1 else str(int(value))
+
+
+def _text(text: str) -> bytes:
+    """A PDF string literal for a standard (WinAnsi encoded) font."""
+    raw = str(text).encode("cp1252", errors="replace")
+    return b"(" + raw.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)") \
+        .replace(b"\r", b"\\r").replace(b"\n", b"\\n") + b")"
+
+
+def _image_source(image):
+    """File path of a path or reportlab ImageReader."""
+    return getattr(image, "fileName", None) or image
+
+
+class _Content:
+    """Operators and resources of one page or form being drawn."""
+
+    def __init__(self):
+        self.ops = []
+        self.fonts = {}      # resource name -> object id
+        self.xobjects = {}   # resource name -> object id
+
+    def stream(self) -> bytes:
+        return zlib.compress("\n".join(self.ops).encode("latin-1"))
+
+    def resources(self) -> str:
+        parts = ["/ProcSet [/PDF /Text /ImageB /ImageC /ImageI]"]
+        if self.fonts:
+            parts.append("/Font << " + " ".join(f"/{k} {v} 0 R" for k, v in self.fonts.items()) + " >>")
+        if self.xobjects:
+            parts.append("/XObject << " + " ".join(f"/{k} {v} 0 R" for k, v in self.xobjects.items()) + " >>")
+        return "<< " + " ".join(parts) + " >>"
+
+
+class StreamCanvas:
+    """Write-as-you-go stand-in for reportlab.pdfgen.canvas.Canvas."""
+
+    def __init__(self, out, pagesize=A4):
+        self.out = out
+        self.pagesize = pagesize
+        self._pos = 0
+        self._offsets = {}   # object id -> byte offset
+        self._next_id = PAGES_ID + 1
+        self._kids = []      # page object ids
+        self._fonts = {}     # font name -> (resource name, object id)
+        self._images = {}    # source path -> (resource name, object id, width, height)
+        self._forms = {}     # form name -> (resource name, object id)
+
+        self._page = _Content()
+        self._content = self._page   # the page, or a form between begin/endForm
+        self._form = None
+        self._font = ("Helvetica", 12)
+        self._closed = False
+
+        self._write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    # ---------- low-level output ----------
+    def _write(self, data: bytes):
+        self.out.write(data)
+        self._pos += len(data)
+
+    def _new_id(self) -> int:
+        obj_id = self._next_id
+        self._next_id += 1
+        return obj_id
+
+    def _write_object(self, obj_id: int, body: str):
+        self._offsets[obj_id] = self._pos
+        self._write(f"{obj_id} 0 obj\n{body}\nendobj\n".encode("latin-1"))
+
+    def _write_stream(self, obj_id: int, entries: str, data: bytes):
+        """Stream object; `entries` are its dictionary entries but /Length."""
+        self._offsets[obj_id] = self._pos
+        self._write(f"{obj_id} 0 obj\n<< {entries} /Length {len(data)} >>\nstream\n".encode("latin-1"))
+        self._write(data)
+        self._write(b"\nendstream\nendobj\n")
+
+    # ---------- resources ----------
+    def _font_resource(self, font_name: str) -> str:
+        entry = self._fonts.get(font_name)
+        if entry is None:
+            obj_id = self._new_id()
+            entry = self._fonts[font_name] = (f"F{len(self._fonts) + 1}", obj_id)
+            self._write_object(obj_id, f"<< /Type /Font /Subtype /Type1 /BaseFont /{font_name}"
+                                       f" /Encoding /WinAnsiEncoding >>")
+        self._content.fonts[entry[0]] = entry[1]
+        return entry[0]
+
+    def _image_resource(self, path: str) -> tuple[str, int, int]:
+        """Resource name and pixel size of the image at `path`, embedding it
+        on first use."""
+        entry = self._images.get(path)
+        if entry is None:
+            with open(path, "rb") as f:
+                try:
+                    width, height, components = readJPEGInfo(f)[:3]
+                    jpeg = components in (1, 3, 4)
+                except Exception:
+                    jpeg = False
+                if jpeg:
+                    f.seek(0)
+                    data = f.read()
+                    space = {1: "DeviceGray", 3: "DeviceRGB", 4: "DeviceCMYK"}[components]
+                    # Adobe CMYK JPEGs are stored inverted
+                    decode = " /Decode [1 0 1 0 1 0 1 0]" if components == 4 else ""
+                    filters = "/DCTDecode"
+                else:
+                    with Image.open(f) as im:
+                        im = flatten_to_rgb(im)
+                        width, height = im.size
+                        data = zlib.compress(im.tobytes())
+                    space, decode, filters = "DeviceRGB", "", "/FlateDecode"
+            # only once the image has been read: an id that is never written
+            # would leave a hole in the xref table
+            obj_id = self._new_id()
+            self._write_stream(
+                obj_id,
+                f"/Type /XObject /Subtype /Image /Width {width} /Height {height}"
+                f" /ColorSpace /{space} /BitsPerComponent 8{decode} /Filter {filters}",
+                data,
+            )
+            entry = self._images[path] = (f"Im{len(self._images) + 1}", obj_id, width, height)
+        self._content.xobjects[entry[0]] = entry[1]
+        return entry[0], entry[2], entry[3]
+
+    # ---------- Canvas API ----------
+    def setFont(self, psfontname: str, size: float, leading=None):
+        self._font = (psfontname, size)
+
+    def setFillColorRGB(self, r: float, g: float, b: float, alpha=None):
+        self._content.ops.append(f"{_num(r)} {_num(g)} {_num(b)} rg")
+
+    def rect(self, x: float, y: float, width: float, height: float, stroke=1, fill=0):
+        op = {(1, 1): "B", (0, 1): "f", (1, 0): "S"}.get((int(bool(stroke)), int(bool(fill))), "n")
+        self._content.ops.append(f"{_num(x)} {_num(y)} {_num(width)} {_num(height)} re {op}")
+
+    def drawString(self, x: float, y: float, text: str):
+        name, size = self._font
+        font = self._font_resource(name)
+        self._content.ops.append(
+            f"BT /{font} {_num(size)} Tf 1 0 0 1 {_num(x)} {_num(y)} Tm "
+            + _text(text).decode("latin-1") + " Tj ET"
+        )
+
+    def drawRightString(self, x: float, y: float, text: str):
+        self.drawString(x - stringWidth(str(text), *self._font), y, text)
+
+    def drawCentredString(self, x: float, y: float, text: str):
+        self.drawString(x - stringWidth(str(text), *self._font) / 2, y, text)
+
+    def drawImage(self, image, x: float, y: float, width=None, height=None, mask=None,
+                  preserveAspectRatio=False, anchor="c"):
+        """Same placement rules as Canvas.drawImage (mask is ignored)."""
+        name, im_w, im_h = self._image_resource(_image_source(image))
+        x, y, width, height, _ = aspectRatioFix(
+            preserveAspectRatio, anchor, x, y, width, height, im_w, im_h
+        )
+        self._content.ops.append(
+            f"q {_num(width)} 0 0 {_num(height)} {_num(x)} {_num(y)} cm /{name} Do Q"
+        )
+        return im_w, im_h
+
+    def hasForm(self, name: str) -> bool:
+        return name in self._forms
+
+    def beginForm(self, name: str, lowerx=0, lowery=0, upperx=None, uppery=None):
+        if upperx is None:
+            upperx = self.pagesize[0]
+        if uppery is None:
+            uppery = self.pagesize[1]
+        self._form = (name, (lowerx, lowery, upperx, uppery))
+        self._content = _Content()
+
+    def endForm(self, **extra_attributes):
+        name, bbox = self._form
+        form, self._content, self._form = self._content, self._page, None
+        obj_id = self._new_id()
+        self._write_stream(
+            obj_id,
+            f"/Type /XObject /Subtype /Form /BBox [{' '.join(_num(v) for v in bbox)}]"
+            f" /Resources {form.resources()} /Filter /FlateDecode",
+            form.stream(),
+        )
+        self._forms[name] = (f"Fm{len(self._forms) + 1}", obj_id)
+
+    def doForm(self, name: str):
+        resource, obj_id = self._forms[name]
+        self._content.xobjects[resource] = obj_id
+        self._content.ops.append(f"/{resource} Do")
+
+    def showPage(self):
+        """Write the current page and start a new one."""
+        page, self._page = self._page, _Content()
+        self._content = self._page
+        content_id, page_id = self._new_id(), self._new_id()
+        self._write_stream(content_id, "/Filter /FlateDecode", page.stream())
+        width, height = self.pagesize
+        self._write_object(
+            page_id,
+            f"<< /Type /Page /Parent {PAGES_ID} 0 R /MediaBox [0 0 {_num(width)} {_num(height)}]"
+            f" /Resources {page.resources()} /Contents {content_id} 0 R >>",
+        )
+        self._kids.append(page_id)
+        if hasattr(self.out, "flush"):
+            self.out.flush()
+
+    def save(self):
+        """Finish the last page (if anything is on it) and close the document."""
+        if self._closed:
+            return
+        if self._page.ops or not self._kids:
+            self.showPage()
+        kids = " ".join(f"{k} 0 R" for k in self._kids)
+        self._write_object(PAGES_ID, f"<< /Type /Pages /Count {len(self._kids)} /Kids [{kids}] >>")
+        self._write_object(CATALOG_ID, f"<< /Type /Catalog /Pages {PAGES_ID} 0 R >>")
+        info_id = self._new_id()
+        created = time.strftime("D:%Y%m%d%H%M%S", time.gmtime())
+        self._write_object(info_id, f"<< /Producer (tile catalogue) /CreationDate ({created}+00'00') >>")
+
+        xref_at = self._pos
+        lines = [f"xref\n0 {self._next_id}\n", "0000000000 65535 f \n"]
+        lines += [f"{self._offsets[i]:010d} 00000 n \n" for i in range(1, self._next_id)]
+        lines.append(f"trailer\n<< /Size {self._next_id} /Root {CATALOG_ID} 0 R /Info {info_id} 0 R >>\n"
+                     f"startxref\n{xref_at}\n%%EOF\n")
+        self._write("".join(lines).encode("latin-1"))
+        self._closed = True
+        if hasattr(self.out, "flush"):
+            self.out.flush()
+
+
+# ------------------------------------------------
+# Streaming output from a render thread
+# ------------------------------------------------
+class StreamClosed(Exception):
+    """The reader went away (e.g. the client disconnected)."""
+
+
+_DONE = object()
+
+
+class _ChunkWriter:
+    """File-like end of iter_chunks: writes are grouped into chunks and
+    handed to the reader, blocking while too many are pending."""
+
+    def __init__(self, chunks: queue.Queue, stop: threading.Event, chunk_size: int):
+        self._chunks = chunks
+        self._stop = stop
+        self._chunk_size = chunk_size
+        self._buf = bytearray()
+
+    def put(self, item):
+        while True:
+            if self._stop.is_set():
+                raise StreamClosed()
+            try:
+                self._chunks.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def write(self, data: bytes):
+        self._buf += data
+        while len(self._buf) >= self._chunk_size:
+            self.put(bytes(self._buf[:self._chunk_size]))
+            del self._buf[:self._chunk_size]
+
+    def flush(self):
+        if self._buf:
+            self.put(bytes(self._buf))
+            self._buf.clear()
+
+
+def iter_chunks(render, chunk_size: int = DEFAULT_CHUNK_BYTES,
+                max_pending: int = DEFAULT_MAX_PENDING):
+    """
+    Run `render(out)` on a thread and yield the bytes it writes to `out`
+    (flushed pages come out straight away). An exception in `render` is
+    re-raised here; closing the generator stops the render at its next
+    write.
+    """
+    chunks = queue.Queue(maxsize=max_pending)
+    stop = threading.Event()
+    writer = _ChunkWriter(chunks, stop, chunk_size)
+
+    def run():
+        try:
+            render(writer)
+            writer.flush()
+            writer.put(_DONE)
+        except StreamClosed:
+            pass
+        except BaseException as e:
+            try:
+                writer.put(e)
+            except StreamClosed:
+                pass
+
+    threading.Thread(target=run, name="pdf-stream", daemon=True).start()
+    try:
+        while True:
+            item = chunks.get()
+            if item is _DONE:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()
@@ -0,0 +1,101 @@
+# search_index.py
+"""
+SQLite FTS5 full-text index over tile name, description, finish (tags)
+and size.
+
+tile_fts is an external-content FTS5 table over `tile`; triggers created by
+the migration keep it in sync with every insert, update and delete, however
+the row is written (upload, Excel import, bulk delete).
+"""
+import re
+
+from sqlalchemy import inspect, text
+
+# bm25 column weights: name, description, tags (finish), size
+BM25_WEIGHTS = (10.0, 1.0, 5.0, 5.0)
+
+TRIGGERS = ("tile_fts_ai", "tile_fts_ad", "tile_fts_au")
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def create(conn):
+    """Create tile_fts, its sync triggers, and index existing rows."""
+    conn.execute(text(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS tile_fts USING fts5("
+        " name, description, tags, size,"
+        " content='tile', content_rowid='id',"
+        " tokenize='unicode61 remove_diacritics 2',"
+        " prefix='2 3')"
+    ))
+    conn.execute(text(
+        "CREATE TRIGGER IF NOT EXISTS tile_fts_ai AFTER INSERT ON tile BEGIN"
+        " INSERT INTO tile_fts(rowid, name, description, tags, size)"
+        " VALUES (new.id, new.name, new.description, new.tags, new.size);"
+        " END"
+    ))
+    conn.execute(text(
+        "CREATE TRIGGER IF NOT EXISTS tile_fts_ad AFTER DELETE ON tile BEGIN"
+        " INSERT INTO tile_fts(tile_fts, rowid, name, description, tags, size)"
+        " VALUES ('delete', old.id, old.name, old.description, old.tags, old.size);"
+        " END"
+    ))
+    conn.execute(text(
+        "CREATE TRIGGER IF NOT EXISTS tile_fts_au AFTER UPDATE ON tile BEGIN"
+        " INSERT INTO tile_fts(tile_fts, rowid, name, description, tags, size)"
+        " VALUES ('delete', old.id, old.name, old.description, old.tags, old.size);"
+        " INSERT INTO tile_fts(rowid, name, description, tags, size)"
+        " VALUES (new.id, new.name, new.description, new.tags, new.size);"
+        " END"
+    ))
+    rebuild(conn)
+
+
+def drop(conn):
+    """Remove tile_fts and its triggers (create() brings them back)."""
+    for trigger in TRIGGERS:
+        conn.execute(text(f"DROP TRIGGER IF EXISTS {trigger}"))
+    conn.execute(text("DROP TABLE IF EXISTS tile_fts"))
+
+
+def rebuild(conn):
+    conn.execute(text("INSERT INTO tile_fts(tile_fts) VALUES ('rebuild')"))
+
+
+def available(engine) -> bool:
+    return engine.dialect.name == "sqlite" and inspect(engine).has_table("tile_fts")
+
+
+def match_expression(query: str) -> str | None:
+    """
+    FTS5 MATCH expression for free text typed by a user: every word must
+    match, the last one as a prefix ("desert bro" -> "desert" "bro"*).
+    """
+    tokens = TOKEN_RE.findall(query or "")
+    if not tokens:
+        return None
+    terms = [f'"{t}"' for t in tokens[:-1]] + [f'"{tokens[-1]}"*']
+    return " ".join(terms)
+
+
+def matching_ids_sql() -> str:
+    """Subquery of tile ids matching :match (for IN filters)."""
+    return "SELECT rowid FROM tile_fts WHERE tile_fts MATCH :match"
+
+
+def search(session, query: str, limit: int = 50, offset: int = 0) -> list[tuple[int, float]]:
+    """(tile id, rank) pairs, best match first."""
+    match = match_expression(query)
+    if not match:
+        return []
+    w_name, w_desc, w_tags, w_size = BM25_WEIGHTS
+    rows = session.execute(
+        text(
+            "SELECT rowid, bm25(tile_fts, :w_name, :w_desc, :w_tags, :w_size) AS rank"
+            " FROM tile_fts WHERE tile_fts MATCH :match"
+            " ORDER BY rank LIMIT :limit OFFSET :offset"
+        ),
+        {"match": match, "w_name": w_name, "w_desc": w_desc, "w_tags": w_tags,
+         "w_size": w_size, "limit": limit, "offset": offset},
+    )
+    return [(row[0], row[1]) for row in rows]
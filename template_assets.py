@@ -0,0 +1,203 @@
+# template_assets.py
+"""
+Registry for the full-page background images (cover poster, tile template).
+
+Each asset is resolved and decoded once per process and reloaded only when
+its directory or file mtime changes. In a PDF it is drawn as a named form
+XObject, so the background is stored once per document and every page just
+references it.
+"""
+import hashlib
+import logging
+import os
+import threading
+import time
+
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfbase.pdfutils import readJPEGInfo
+
+import metrics
+
+log = logging.getLogger(__name__)
+
+IMAGE_EXTS = (".jpg", ".jpeg", ".png")
+
+# how often (seconds) to re-stat the directory/file for changes
+CHECK_INTERVAL = 2.0
+
+
+def _check_jpeg(path: str):
+    """Raise unless `path` is a JPEG reportlab can embed as it is."""
+    with open(path, "rb") as f:
+        components = readJPEGInfo(f)[2]
+    if components not in (1, 3, 4):
+        raise ValueError(f"unsupported JPEG ({components} components): {path}")
+
+
+class TemplateAsset:
+    def __init__(self, key: str, directory: str, preferred_names=()):
+        self.key = key
+        self.directory = directory
+        self.preferred_names = list(preferred_names)
+
+        self._lock = threading.Lock()
+        # ImageReader isn't thread-safe; PDFs built in parallel take turns
+        # embedding it (once per document)
+        self._draw_lock = threading.Lock()
+        self._checked_at = 0.0
+        self._dir_mtime = None
+        self._path = None
+        self._file_mtime = None
+        self._reader = None
+
+    # ---------- resolution ----------
+    @metrics.span("asset_lookup")
+    def _resolve(self) -> str | None:
+        if not os.path.isdir(self.directory):
+            log.warning("%s dir does not exist: %s", self.key, self.directory)
+            return None
+
+        for name in self.preferred_names:
+            candidate = os.path.join(self.directory, name)
+            if os.path.exists(candidate):
+                log.debug("%s found (preferred): %s", self.key, candidate)
+                return candidate
+
+        for fname in os.listdir(self.directory):
+            if fname.lower().endswith(IMAGE_EXTS):
+                candidate = os.path.join(self.directory, fname)
+                log.debug("%s found: %s", self.key, candidate)
+                return candidate
+
+        log.warning("No %s image found in: %s", self.key, self.directory)
+        return None
+
+    def _refresh(self, force: bool = False):
+        """Re-resolve / drop the decoded image if anything changed on disk."""
+        now = time.monotonic()
+        if not force and now - self._checked_at < CHECK_INTERVAL:
+            return
+        self._checked_at = now
+
+        try:
+            dir_mtime = os.stat(self.directory).st_mtime_ns
+        except OSError:
+            dir_mtime = None
+
+        if force or dir_mtime != self._dir_mtime or self._path is None:
+            self._dir_mtime = dir_mtime
+            path = self._resolve() if dir_mtime is not None else None
+            if path != self._path:
+                self._path = path
+                self._file_mtime = None
+                self._reader = None
+
+        if self._path:
+            try:
+                file_mtime = os.stat(self._path).st_mtime_ns
+            except OSError:
+                self._path = None
+                self._file_mtime = None
+                self._reader = None
+                return
+            if file_mtime != self._file_mtime:
+                self._file_mtime = file_mtime
+                self._reader = None
+
+    # ---------- public ----------
+    def path(self) -> str | None:
+        with self._lock:
+            self._refresh()
+            return self._path
+
+    def version(self) -> str | None:
+        """Short token that changes whenever the asset file changes."""
+        with self._lock:
+            self._refresh()
+            if not self._path:
+                return None
+            raw = f"{self._path}:{self._file_mtime}".encode("utf-8")
+            return hashlib.sha1(raw).hexdigest()[:12]
+
+    def reader(self) -> ImageReader | None:
+        """Decoded image, shared by every PDF built in this process."""
+        with self._lock:
+            self._refresh()
+            if self._path and self._reader is None:
+                self._reader = ImageReader(self._path)
+            return self._reader
+
+    def reload(self):
+        with self._lock:
+            self._refresh(force=True)
+
+    def form_name(self) -> str | None:
+        """Name of the form XObject draw() defines (changes with the file)."""
+        version = self.version()
+        return f"{self.key}_{version}" if version else None
+
+    def draw_placeholder(self, c, width: float, height: float) -> str | None:
+        """
+        Define this asset's form on canvas `c` as an empty stub, so draw()
+        only references it by name. Used for page fragments, which get the
+        real form swapped in when they're assembled (see page_fragments.py).
+        Returns the form name, or None if there is no asset.
+        """
+        form_name = self.form_name()
+        if form_name and not c.hasForm(form_name):
+            c.beginForm(form_name, 0, 0, width, height)
+            c.endForm()
+        return form_name
+
+    def draw(self, c, width: float, height: float, image_path: str | None = None) -> bool:
+        """
+        Draw the asset over the whole page. The first call on a canvas
+        defines a form XObject; later pages only reference it.
+        `image_path` is a pre-scaled JPEG of the asset to embed instead of
+        the original file (see app.background_image); if it can't be read,
+        the original is drawn.
+        Returns False if there is no asset to draw.
+        """
+        form_name = self.form_name()
+        if image_path and form_name and not c.hasForm(form_name):
+            # checked before opening the form, so a broken file can't leave
+            # the canvas stuck inside beginForm; the original is drawn instead
+            try:
+                _check_jpeg(image_path)
+            except Exception as e:
+                log.warning("Unreadable %s image %s: %s", self.key, image_path, e)
+                image_path = None
+        if image_path:
+            if not form_name:
+                return False
+            if not c.hasForm(form_name):
+                # by path: reportlab embeds the JPEG as it is
+                c.beginForm(form_name, 0, 0, width, height)
+                c.drawImage(image_path, 0, 0, width=width, height=height,
+                            preserveAspectRatio=False, anchor="sw")
+                c.endForm()
+            c.doForm(form_name)
+            return True
+
+        reader = self.reader()
+        if not form_name or reader is None:
+            return False
+        if not c.hasForm(form_name):
+            with self._draw_lock:
+                # decode (once, cached on the reader) before opening the form
+                # so a broken file can't leave the canvas stuck inside beginForm
+                with metrics.span("image_decode"):
+                    reader.getRGBData()
+                c.beginForm(form_name, 0, 0, width, height)
+                c.drawImage(
+                    reader,
+                    0,
+                    0,
+                    width=width,
+                    height=height,
+                    preserveAspectRatio=False,
+                    anchor="sw",
+                )
+                c.endForm()
+        c.doForm(form_name)
+        return True
@@ -0,0 +1,41 @@
+# tests/conftest.py
+"""
+Shared setup: the project root on sys.path, and app.py opening its database
+in a throwaway instance folder (it does so when imported).
+
+    python -m pytest tests
+"""
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+os.environ["INSTANCE_PATH"] = tempfile.mkdtemp(prefix="tile_tests_")
+os.environ.pop("DATABASE_URL", None)
+
+import pytest  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def web():
+    import app as web
+
+    web.init_app()
+    return web
+
+
+@pytest.fixture
+def clean_db(web):
+    """An empty catalogue. Stored photos the test writes to static/images
+    are removed afterwards."""
+    with web.app.app_context():
+        for model in (web.ImportRow, web.ImportJob, web.Tile, web.ImageBlob,
+                      web.OrphanFile, web.Company):
+            model.query.delete()
+        web.db.session.commit()
+    before = set(os.listdir(web.IMAGES_DIR))
+    yield web
+    for name in set(os.listdir(web.IMAGES_DIR)) - before:
+        os.remove(os.path.join(web.IMAGES_DIR, name))
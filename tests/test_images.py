@@ -0,0 +1,93 @@
+# tests/test_images.py
+"""
+Stored photos are shared by content hash and reference counted; once no
+tile uses one, the sweeper removes the file with its thumbnails and PDF
+derivatives.
+"""
+import os
+from datetime import datetime, timedelta
+from io import BytesIO
+
+from PIL import Image
+
+
+def jpeg_bytes(color) -> bytes:
+    out = BytesIO()
+    Image.new("RGB", (640, 480), color).save(out, "JPEG")
+    return out.getvalue()
+
+
+def upload(client, name: str, photo: bytes):
+    rv = client.post("/upload_tile", data={
+        "name": name, "size": "600X600", "finish": "matt",
+        "photo": (BytesIO(photo), "photo.jpg"),
+    }, content_type="multipart/form-data")
+    assert rv.status_code == 302
+
+
+def cached_files(directory: str, sha: str) -> list[str]:
+    if not os.path.isdir(directory):
+        return []
+    return [name for name in os.listdir(directory) if name.startswith(sha)]
+
+
+def test_refcount_and_sweep_on_delete(clean_db, monkeypatch):
+    web = clean_db
+    client = web.app.test_client()
+    photo = jpeg_bytes((200, 40, 40))
+    upload(client, "first", photo)
+    upload(client, "second", photo)
+
+    with web.app.app_context():
+        tiles = web.Tile.query.order_by(web.Tile.id).all()
+        assert [t.name for t in tiles] == ["FIRST", "SECOND"]
+        assert tiles[0].photo_path == tiles[1].photo_path
+        path = web.image_file_path(tiles[0].photo_path)
+        sha = web.image_key_for_path(path)
+        blob = web.db.session.get(web.ImageBlob, sha)
+        assert blob.ref_count == 2
+        ids = [t.id for t in tiles]
+
+    assert web.get_tile_image_derivative(path)
+    assert cached_files(web.app.config["IMAGE_CACHE_DIR"], sha)
+    assert cached_files(web.app.config["THUMBS_DIR"], sha)
+    monkeypatch.setitem(web.app.config, "IMAGE_SWEEP_GRACE_SECONDS", -1)
+
+    # one tile left: the photo stays
+    client.post("/delete_tiles", data={"tile_ids": [ids[0]]})
+    web.sweep_image_files()
+    with web.app.app_context():
+        assert web.db.session.get(web.ImageBlob, sha).ref_count == 1
+    assert os.path.exists(path)
+
+    client.post("/delete_tiles", data={"tile_ids": [ids[1]]})
+    with web.app.app_context():
+        blob = web.db.session.get(web.ImageBlob, sha)
+        assert blob is None or (blob.ref_count == 0 and blob.released_at is not None)
+    web.sweep_image_files()
+    with web.app.app_context():
+        assert web.db.session.get(web.ImageBlob, sha) is None
+    assert not os.path.exists(path)
+    assert cached_files(web.app.config["THUMBS_DIR"], sha) == []
+    assert cached_files(web.app.config["IMAGE_CACHE_DIR"], sha) == []
+
+
+def test_sweep_spares_photo_reused_within_grace(clean_db):
+    web = clean_db
+    with web.app.app_context():
+        filename = web.store_tile_image(jpeg_bytes((40, 200, 40)))
+        web.db.session.commit()
+        sha = web.image_store.hash_from_path(filename)
+        # released long ago, then picked up again by an import
+        web.db.session.execute(
+            web.update(web.ImageBlob)
+            .where(web.ImageBlob.sha256 == sha)
+            .values(ref_count=0, released_at=datetime.utcnow() - timedelta(days=1))
+        )
+        web.db.session.commit()
+        assert web.reuse_stored_image(sha)
+
+    web.sweep_image_files()
+    with web.app.app_context():
+        assert web.db.session.get(web.ImageBlob, sha) is not None
+    assert os.path.exists(os.path.join(web.IMAGES_DIR, filename))
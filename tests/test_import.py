@@ -0,0 +1,66 @@
+# tests/test_import.py
+"""
+An Excel import that fails part-way keeps the batches it committed, and
+resuming it imports the remaining rows exactly once.
+"""
+import os
+import uuid
+
+from synthetic import make_photos, make_workbook
+
+ROWS = 9
+FAIL_ON_PRICE = 97   # sheet row 8 (tile 7), while its batch is being parsed
+
+
+class InlineExecutor:
+    def submit(self, fn, *args):
+        fn(*args)
+
+
+def test_failed_import_resumes(clean_db, monkeypatch, tmp_path):
+    web = clean_db
+    photos = make_photos(str(tmp_path), ROWS, size=(120, 90))
+    sheet = make_workbook(str(tmp_path / "tiles.xlsx"), photos)
+    job_id = uuid.uuid4().hex
+    with web.app.app_context():
+        web.db.session.add(web.ImportJob(id=job_id, file_path=sheet, original_name="tiles.xlsx"))
+        web.db.session.commit()
+
+    monkeypatch.setitem(web.app.config, "EXCEL_IMPORT_BATCH_SIZE", 2)
+    parse_price = web.parse_price
+
+    def failing_parse_price(value):
+        if value == FAIL_ON_PRICE:
+            raise RuntimeError("disk full")
+        return parse_price(value)
+
+    monkeypatch.setattr(web, "parse_price", failing_parse_price)
+    web.run_import_job(job_id)
+
+    client = web.app.test_client()
+    status = client.get(f"/import_jobs/{job_id}").get_json()
+    assert status["state"] == "failed" and status["can_resume"]
+    assert "disk full" in status["error"]
+    committed = status["last_committed_row"] - 1
+    assert 0 < committed < FAIL_ON_PRICE - 90
+    with web.app.app_context():
+        assert web.Tile.query.count() == committed == status["rows_imported"]
+
+    monkeypatch.setattr(web, "parse_price", parse_price)
+    monkeypatch.setattr(web, "import_executor", InlineExecutor())
+    assert client.post(f"/import_jobs/{job_id}/resume").status_code == 202
+
+    status = client.get(f"/import_jobs/{job_id}").get_json()
+    assert status["state"] == "done" and not status["can_resume"]
+    assert status["rows_imported"] == status["rows_processed"] == ROWS
+    assert status["images_extracted"] == ROWS
+    rows = client.get(f"/import_jobs/{job_id}/rows").get_json()["rows"]
+    assert [r["row"] for r in rows] == list(range(2, ROWS + 2))
+    with web.app.app_context():
+        tiles = web.Tile.query.all()
+        assert sorted(t.name for t in tiles) == sorted(f"BENCH TILE {n}" for n in range(1, ROWS + 1))
+        assert {t.id for t in tiles} == {r["tile_id"] for r in rows}
+        for tile in tiles:
+            assert os.path.exists(web.image_file_path(tile.photo_path))
+            blob = web.db.session.get(web.ImageBlob, web.image_key_for_path(tile.photo_path))
+            assert blob.ref_count == 1
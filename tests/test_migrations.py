@@ -0,0 +1,132 @@
+# tests/test_migrations.py
+"""
+Every migration applied to a database with the original (baseline) schema:
+free-text prices, mixed-case names, Windows photo paths, the old models.py
+`tiles` table in the same file and in its own root database.db.
+"""
+import sqlite3
+
+from sqlalchemy import create_engine, inspect, text
+
+import migrations
+from models import db
+
+BASELINE_TILE = (
+    "CREATE TABLE tile ("
+    " id INTEGER NOT NULL PRIMARY KEY,"
+    " name VARCHAR(200), sku VARCHAR(100), size VARCHAR(100), price VARCHAR(100),"
+    " description VARCHAR(500), tags VARCHAR(500),"
+    " photo_path VARCHAR(500), web_path VARCHAR(500))"
+)
+LEGACY_TILES = (
+    "CREATE TABLE tiles ("
+    " id INTEGER NOT NULL PRIMARY KEY, name VARCHAR(200) NOT NULL,"
+    " sku VARCHAR(100), size VARCHAR(100), price VARCHAR(50), description TEXT,"
+    " tags VARCHAR(250), photo_path VARCHAR(500), created_at DATETIME)"
+)
+LEGACY_COMPANY = (
+    "CREATE TABLE company (id INTEGER NOT NULL PRIMARY KEY, company_name VARCHAR(200),"
+    " logo_path VARCHAR(500), phone VARCHAR(50), email VARCHAR(120))"
+)
+
+
+def baseline_database(path: str):
+    conn = sqlite3.connect(path)
+    conn.execute(BASELINE_TILE)
+    conn.executemany(
+        "INSERT INTO tile (id, name, size, price, tags, photo_path, web_path)"
+        " VALUES (?, ?, ?, ?, ?, ?, ?)",
+        [
+            (1, "cloud white", "600x600 mm", "Rs 1,250/-", "matt", None, None),
+            (2, "DESERT BROWN", "300X600", "n/a", "GLOSSY",
+             "C:\\Users\\dealer\\project\\static\\images\\desert.jpg", None),
+        ],
+    )
+    conn.execute(LEGACY_TILES)
+    conn.execute(
+        "INSERT INTO tiles (name, price, created_at) VALUES ('same file', '90', '2025-11-15 10:57:07')"
+    )
+    conn.commit()
+    conn.close()
+
+
+def legacy_database(path: str):
+    conn = sqlite3.connect(path)
+    conn.execute(LEGACY_TILES)
+    conn.execute(
+        "INSERT INTO tiles (name, sku, price, created_at)"
+        " VALUES ('Marble Tile A', 'MTA-001', '120', '2025-11-15 10:58:02')"
+    )
+    conn.execute(LEGACY_COMPANY)
+    conn.execute("INSERT INTO company (company_name, phone) VALUES ('Old Co', '123')")
+    conn.commit()
+    conn.close()
+
+
+def test_upgrade_from_baseline(tmp_path, monkeypatch):
+    baseline_database(str(tmp_path / "database.db"))
+    legacy_database(str(tmp_path / "legacy.db"))
+    monkeypatch.setenv("LEGACY_DATABASE", str(tmp_path / "legacy.db"))
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'database.db'}")
+    db.metadata.create_all(engine)   # as init_app: new tables only
+    applied = migrations.upgrade(engine)
+    assert applied == [version for version, _, _ in migrations.MIGRATIONS]
+    assert migrations.upgrade(engine) == []
+
+    with engine.connect() as conn:
+        assert migrations.current_version(conn) == applied[-1]
+        assert not inspect(conn).has_table("tiles")
+        index_names = {i["name"] for i in inspect(conn).get_indexes("tile")}
+        assert {"ix_tile_name", "ix_tile_size", "ix_tile_tags", "ix_tile_created_at"} <= index_names
+
+        rows = {
+            row.name: row for row in conn.execute(text(
+                "SELECT id, name, price, tags, photo_path, web_path, image_missing, created_at"
+                " FROM tile"
+            ))
+        }
+        assert set(rows) == {"CLOUD WHITE", "DESERT BROWN", "SAME FILE", "MARBLE TILE A"}
+
+        cloud = rows["CLOUD WHITE"]
+        assert float(cloud.price) == 1250
+        assert cloud.tags == "MATT"
+        assert cloud.created_at is None   # unknown, not the migration time
+
+        desert = rows["DESERT BROWN"]
+        assert desert.price is None
+        assert desert.photo_path == "static/images/desert.jpg"
+        assert desert.web_path == "/static/images/desert.jpg"
+        assert desert.image_missing
+
+        assert float(rows["SAME FILE"].price) == 90
+        assert str(rows["SAME FILE"].created_at).startswith("2025-11-15 10:57:07")
+        assert str(rows["MARBLE TILE A"].created_at).startswith("2025-11-15 10:58:02")
+
+        companies = conn.execute(text("SELECT company_name, phone FROM company")).fetchall()
+        assert [tuple(c) for c in companies] == [("Old Co", "123")]
+
+        # full-text index covers size, and follows later writes
+        def fts(term):
+            return {r[0] for r in conn.execute(
+                text("SELECT rowid FROM tile_fts WHERE tile_fts MATCH :m"), {"m": term}
+            )}
+
+        assert fts('"600x600"*') == {cloud.id}
+        conn.execute(text("UPDATE tile SET size = '800x800' WHERE id = :id"), {"id": cloud.id})
+        assert fts('"800x800"') == {cloud.id}
+        assert fts('"600x600"*') == set()
+    engine.dispose()
+
+
+def test_legacy_database_only_for_default_instance(tmp_path, monkeypatch):
+    monkeypatch.delenv("LEGACY_DATABASE", raising=False)
+    legacy_database(str(tmp_path / "legacy.db"))
+    monkeypatch.setattr(migrations, "LEGACY_DATABASE", str(tmp_path / "legacy.db"))
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'database.db'}")
+    db.metadata.create_all(engine)
+    migrations.upgrade(engine)
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT COUNT(*) FROM tile")).scalar() == 0
+    engine.dispose()
@@ -0,0 +1,43 @@
+# tests/test_page_fragments.py
+"""
+prepend_page appends an incremental update to a body PDF; the result has to
+hold up under a strict reader, including after a second update.
+"""
+from pypdf import PdfReader
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfgen import canvas
+
+from page_fragments import prepend_page
+
+
+def write_pdf(path, labels):
+    c = canvas.Canvas(str(path), pagesize=A4)
+    for label in labels:
+        c.setFont("Helvetica", 14)
+        c.drawString(72, 720, label)
+        c.showPage()
+    c.save()
+
+
+def page_texts(path) -> list[str]:
+    reader = PdfReader(str(path), strict=True)
+    texts = []
+    for page in reader.pages:
+        page["/Resources"].get_object()
+        texts.append(page.extract_text().strip())
+    return texts
+
+
+def test_prepend_page_is_strictly_valid(tmp_path):
+    body, covers = tmp_path / "body.pdf", tmp_path / "covers.pdf"
+    write_pdf(body, ["body 1", "body 2", "body 3"])
+    write_pdf(covers, ["cover A", "cover B"])
+
+    once = tmp_path / "once.pdf"
+    prepend_page(str(body), str(covers), 1, str(once))
+    assert once.read_bytes().startswith(body.read_bytes())   # body copied as is
+    assert page_texts(once) == ["cover B", "body 1", "body 2", "body 3"]
+
+    twice = tmp_path / "twice.pdf"
+    prepend_page(str(once), str(covers), 0, str(twice))
+    assert page_texts(twice) == ["cover A", "cover B", "body 1", "body 2", "body 3"]
@@ -0,0 +1,60 @@
+# tests/test_pdf_stream.py
+"""
+Streamed catalogues (pdf_stream.StreamCanvas) must always be PDFs a strict
+reader accepts, including when some of their images can't be read.
+"""
+from io import BytesIO
+
+import pytest
+from pypdf import PdfReader
+from reportlab.lib.pagesizes import A4
+
+import pdf_stream
+from synthetic import make_photos, make_tiles
+
+
+def read_strict(data: bytes) -> PdfReader:
+    reader = PdfReader(BytesIO(data), strict=True)
+    for page in reader.pages:
+        page.get_contents()
+        page["/Resources"].get_object()
+    return reader
+
+
+def test_unreadable_image_leaves_valid_pdf(tmp_path):
+    photo = make_photos(str(tmp_path), 1, size=(80, 60))[0]
+    broken = tmp_path / "broken.png"
+    broken.write_bytes(b"\x89PNG\r\n\x1a\n not an image")
+
+    out = BytesIO()
+    c = pdf_stream.StreamCanvas(out, pagesize=A4)
+    with pytest.raises(Exception):
+        c.drawImage(str(broken), 10, 10, width=50, height=50)
+    c.drawImage(photo, 100, 100, width=80, height=60)
+    c.drawString(100, 50, "after the broken image")
+    c.showPage()
+    c.save()
+
+    assert len(read_strict(out.getvalue()).pages) == 1
+
+
+@pytest.mark.parametrize("layout", ["detail", "grid2", "grid3"])
+def test_streamed_catalogue_is_valid(web, layout, tmp_path):
+    photos = make_photos(str(tmp_path), 4, size=(800, 600))
+    with open(photos[1], "rb") as f:
+        data = f.read()
+    with open(photos[1], "wb") as f:
+        f.write(data[: len(data) // 3])   # truncated photo
+    logo = tmp_path / "logo.png"
+    logo.write_bytes(b"\x89PNG\r\n\x1a\n not an image")
+
+    with web.app.app_context():
+        web.db.session.query(web.Company).delete()
+        web.db.session.add(web.Company(company_name="Acme", logo_path=str(logo)))
+        web.db.session.commit()
+
+        out = BytesIO()
+        web.stream_catalogue_pdf(out, make_tiles(photos), "Client", layout)
+
+    pages = len(read_strict(out.getvalue()).pages)
+    assert pages == (5 if layout == "detail" else 2)
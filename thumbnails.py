@@ -0,0 +1,74 @@
+# thumbnails.py
+"""
+Small JPEG thumbnails of tile photos for the catalogue grid.
+
+Thumbnails are built in a few fixed widths (for <img srcset>) and named by
+the photo's content key, so a URL that carries the key can be cached by the
+browser forever.
+"""
+import os
+import uuid
+
+from PIL import Image, ImageOps
+
+from image_cache import flatten_to_rgb
+
+THUMB_WIDTHS = (160, 320, 640)
+THUMB_QUALITY = 80
+
+
+def thumb_name(key: str, width: int) -> str:
+    return f"{key}_{width}.jpg"
+
+
+def pick_width(width: int) -> int:
+    """Smallest thumbnail width >= `width` (or the largest one)."""
+    for w in THUMB_WIDTHS:
+        if w >= width:
+            return w
+    return THUMB_WIDTHS[-1]
+
+
+def build_thumbnails(src_path: str, thumbs_dir: str, key: str,
+                     widths=THUMB_WIDTHS) -> list[str]:
+    """Decode `src_path` once and write every missing width. Returns paths."""
+    os.makedirs(thumbs_dir, exist_ok=True)
+    todo = [w for w in sorted(widths, reverse=True)
+            if not os.path.exists(os.path.join(thumbs_dir, thumb_name(key, w)))]
+    paths = [os.path.join(thumbs_dir, thumb_name(key, w)) for w in widths]
+    if not todo:
+        return paths
+
+    with Image.open(src_path) as im:
+        im.draft("RGB", (todo[0], todo[0]))
+        im = flatten_to_rgb(ImageOps.exif_transpose(im))
+        # largest first, each next size scaled down from the previous one
+        for w in todo:
+            h = max(1, round(im.height * w / im.width))
+            if im.width > w:
+                im = im.resize((w, h), Image.LANCZOS)
+            dest = os.path.join(thumbs_dir, thumb_name(key, w))
+            tmp_path = f"{dest}.{uuid.uuid4().hex}.tmp"
+            im.save(tmp_path, format="JPEG", quality=THUMB_QUALITY, optimize=True,
+                    progressive=True)
+            os.replace(tmp_path, dest)
+    return paths
+
+
+def get_thumbnail(src_path: str, thumbs_dir: str, key: str, width: int) -> str:
+    """Path of the `width` thumbnail, building thumbnails if missing."""
+    path = os.path.join(thumbs_dir, thumb_name(key, width))
+    if not os.path.exists(path):
+        build_thumbnails(src_path, thumbs_dir, key)
+    return path
+
+
+def evict(thumbs_dir: str, key: str) -> int:
+    removed = 0
+    for w in THUMB_WIDTHS:
+        try:
+            os.remove(os.path.join(thumbs_dir, thumb_name(key, w)))
+            removed += 1
+        except OSError:
+            pass
+    return removed
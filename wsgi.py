@@ -0,0 +1,5 @@
+# wsgi.py
+"""WSGI entry point: gunicorn -c gunicorn.conf.py wsgi:app"""
+from app import app, init_app  # noqa: F401  (app is what gunicorn serves)
+
+init_app()
@@ -0,0 +1,220 @@
+# xlsx_images.py
+"""
+Find pictures embedded in an .xlsx by the cell they sit in, without loading
+the workbook. Only the small XML parts that describe where pictures are
+anchored are parsed up front; picture bytes are read from the zip on demand.
+
+Handles both kinds of embedded pictures Excel writes:
+  - floating pictures anchored to a cell (xl/drawings/drawingN.xml)
+  - "Place in Cell" pictures stored as rich values (xl/richData/*)
+"""
+import posixpath
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+
+NS = {
+    "main": "http://schemas.openxmlformats.org/spreadsheetml/2006/main",
+    "r": "http://schemas.openxmlformats.org/officeDocument/2006/relationships",
+    "rel": "http://schemas.openxmlformats.org/package/2006/relationships",
+    "xdr": "http://schemas.openxmlformats.org/drawingml/2006/spreadsheetDrawing",
+    "a": "http://schemas.openxmlformats.org/drawingml/2006/main",
+    "rd": "http://schemas.microsoft.com/office/spreadsheetml/2017/richdata",
+    "rvrel": "http://schemas.microsoft.com/office/spreadsheetml/2022/richvaluerel",
+    "xlrd": "http://schemas.microsoft.com/office/spreadsheetml/2017/richdata",
+}
+R_ID = f"{{{NS['r']}}}id"
+R_EMBED = f"{{{NS['r']}}}embed"
+
+CELL_REF_RE = re.compile(r"^([A-Z]+)(\d+)$")
+
+
+def column_index(letters: str) -> int:
+    """'A' -> 1, 'G' -> 7, 'AA' -> 27."""
+    n = 0
+    for ch in letters:
+        n = n * 26 + (ord(ch) - 64)
+    return n
+
+
+def _rels_path(part: str) -> str:
+    folder, name = posixpath.split(part)
+    return posixpath.join(folder, "_rels", name + ".rels")
+
+
+class XlsxImages:
+    """
+    Map of (row, col) -> picture for one worksheet (1-based like openpyxl).
+    Use as a context manager so the zip is closed afterwards.
+    """
+
+    def __init__(self, filepath: str, sheet_index: int | None = None):
+        self._zip = zipfile.ZipFile(filepath)
+        self._names = set(self._zip.namelist())
+        self.sheet_path = self._sheet_path(sheet_index)
+        self.cells: dict[tuple[int, int], str] = {}
+
+        if self.sheet_path:
+            self._load_drawing_anchors()
+            self._load_in_cell_images()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._zip.close()
+
+    def __len__(self):
+        return len(self.cells)
+
+    def media_for(self, row: int, col: int) -> str | None:
+        """Zip path of the picture in the given cell, if any."""
+        return self.cells.get((row, col))
+
+    def read(self, media_path: str) -> bytes:
+        return self._zip.read(media_path)
+
+    # ---------- parsing helpers ----------
+    def _xml(self, part: str):
+        if part not in self._names:
+            return None
+        with self._zip.open(part) as f:
+            return ET.parse(f).getroot()
+
+    def _rels(self, part: str) -> dict[str, str]:
+        """Relationship id -> absolute zip path for `part`."""
+        root = self._xml(_rels_path(part))
+        if root is None:
+            return {}
+        base = posixpath.dirname(part)
+        rels = {}
+        for rel in root.findall("rel:Relationship", NS):
+            if rel.get("TargetMode") == "External":
+                continue
+            target = rel.get("Target", "")
+            if target.startswith("/"):
+                path = target.lstrip("/")
+            else:
+                path = posixpath.normpath(posixpath.join(base, target))
+            rels[rel.get("Id")] = path
+        return rels
+
+    def _sheet_path(self, sheet_index: int | None) -> str | None:
+        """Zip path of the requested (default: active) worksheet."""
+        wb = self._xml("xl/workbook.xml")
+        if wb is None:
+            return None
+
+        if sheet_index is None:
+            view = wb.find("main:bookViews/main:workbookView", NS)
+            sheet_index = int(view.get("activeTab", 0)) if view is not None else 0
+
+        sheets = wb.findall("main:sheets/main:sheet", NS)
+        if not sheets:
+            return None
+        sheet = sheets[min(sheet_index, len(sheets) - 1)]
+        return self._rels("xl/workbook.xml").get(sheet.get(R_ID))
+
+    def _load_drawing_anchors(self):
+        for drawing_path in self._rels(self.sheet_path).values():
+            if not drawing_path.startswith("xl/drawings/"):
+                continue
+            root = self._xml(drawing_path)
+            if root is None:
+                continue
+            rels = self._rels(drawing_path)
+
+            anchors = root.findall("xdr:twoCellAnchor", NS) + root.findall("xdr:oneCellAnchor", NS)
+            for anchor in anchors:
+                frm = anchor.find("xdr:from", NS)
+                blip = anchor.find(".//a:blip", NS)
+                if frm is None or blip is None:
+                    continue
+                media = rels.get(blip.get(R_EMBED))
+                if not media:
+                    continue
+                # anchor markers are 0-based
+                row = int(frm.findtext("xdr:row", "0", NS)) + 1
+                col = int(frm.findtext("xdr:col", "0", NS)) + 1
+                self.cells.setdefault((row, col), media)
+
+    def _rich_value_media(self) -> list[str | None]:
+        """
+        Picture for each entry in valueMetadata (what a cell's vm="N"
+        points at), following metadata -> rich value -> rich value rel.
+        """
+        meta = self._xml("xl/metadata.xml")
+        values = self._xml("xl/richData/rdrichvalue.xml")
+        structs = self._xml("xl/richData/rdrichvaluestructure.xml")
+        rel_list = self._xml("xl/richData/richValueRel.xml")
+        if meta is None or values is None or structs is None or rel_list is None:
+            return []
+
+        # which key in each structure holds the picture's rel index
+        image_key_pos = []
+        for s in structs.findall("rd:s", NS):
+            keys = [k.get("n") for k in s.findall("rd:k", NS)]
+            pos = keys.index("_rvRel:LocalImageIdentifier") if "_rvRel:LocalImageIdentifier" in keys else None
+            image_key_pos.append(pos)
+
+        rel_rids = [r.get(R_ID) for r in rel_list.findall("rvrel:rel", NS)]
+        rel_targets = self._rels("xl/richData/richValueRel.xml")
+
+        rv_media = []
+        for rv in values.findall("rd:rv", NS):
+            media = None
+            struct = int(rv.get("s", 0))
+            pos = image_key_pos[struct] if struct < len(image_key_pos) else None
+            vals = [v.text for v in rv.findall("rd:v", NS)]
+            if pos is not None and pos < len(vals):
+                rel_idx = int(vals[pos])
+                if rel_idx < len(rel_rids):
+                    media = rel_targets.get(rel_rids[rel_idx])
+            rv_media.append(media)
+
+        # futureMetadata XLRICHVALUE blocks point at rich values
+        future = []
+        for fm in meta.findall("main:futureMetadata", NS):
+            if fm.get("name") != "XLRICHVALUE":
+                continue
+            for bk in fm.findall("main:bk", NS):
+                rvb = bk.find(".//xlrd:rvb", NS)
+                future.append(int(rvb.get("i")) if rvb is not None else None)
+
+        # valueMetadata blocks point at futureMetadata entries
+        result = []
+        for bk in meta.findall("main:valueMetadata/main:bk", NS):
+            rc = bk.find("main:rc", NS)
+            media = None
+            if rc is not None:
+                v = int(rc.get("v", -1))
+                rv_idx = future[v] if 0 <= v < len(future) else None
+                if rv_idx is not None and rv_idx < len(rv_media):
+                    media = rv_media[rv_idx]
+            result.append(media)
+        return result
+
+    def _load_in_cell_images(self):
+        vm_media = self._rich_value_media()
+        if not vm_media or self.sheet_path not in self._names:
+            return
+
+        c_tag = f"{{{NS['main']}}}c"
+        # stream the sheet: we only want cells carrying a vm attribute
+        with self._zip.open(self.sheet_path) as f:
+            for _, el in ET.iterparse(f, events=("end",)):
+                if el.tag != c_tag:
+                    if el.tag == f"{{{NS['main']}}}row":
+                        el.clear()
+                    continue
+                vm = el.get("vm")
+                ref = el.get("r")
+                if vm and ref:
+                    m = CELL_REF_RE.match(ref)
+                    idx = int(vm) - 1  # vm is 1-based
+                    if m and 0 <= idx < len(vm_media) and vm_media[idx]:
+                        key = (int(m.group(2)), column_index(m.group(1)))
+                        self.cells.setdefault(key, vm_media[idx])